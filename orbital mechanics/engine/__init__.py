@@ -0,0 +1,24 @@
+"""Simulation engine shared by the orbital simulator scripts."""
+
+from engine.barnes_hut import BarnesHut
+from engine.body_system import BodySystem, BodyView
+from engine.camera import Projection
+from engine.chaos import megno, stability_map
+from engine.ensemble import perturbed, run_ensemble
+from engine.gravity import G, apply_gravity, direct_accelerations, field_accelerations
+from engine.ias15 import IAS15
+from engine.integrators import (INTEGRATORS, SplittingIntegrator, advance_bodies, advance_by, advance_system,
+                                run_system)
+from engine.kernels import fused_steps
+from engine.parallel import ParallelSolver
+from engine.particle_mesh import ParticleMesh
+from engine.presets import PRESETS, preset_arrays, preset_system
+from engine.recorder import TrajectoryPlayer, TrajectoryRecorder
+from engine.regularization import EncounterRegularization
+from engine.rewind import KeyframeRing
+from engine.scheduler import SubstepScheduler
+from engine.sim_process import SimulationProcess
+from engine.snapshot import decode_snapshot, encode_snapshot, load_snapshot, save_snapshot
+from engine.tracers import TracerParticles
+from engine.trails import TrailBuffer
+from engine.wisdom_holman import WisdomHolman
@@ -0,0 +1,151 @@
+"""Command line front end for headless runs; never imports pygame.
+
+    python -m engine list
+    python -m engine run preset_1 --time 3.15e7 --dt 3600 --integrator yoshida4 --output final.npz
+    python -m engine run solar_system --time 3.15e9 --record run.orbrec --record-every 24
+    python -m engine ensemble binary --members 1000 --steps 20000 --dt 3600
+
+Run from the "orbital mechanics" directory.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from engine.barnes_hut import BarnesHut
+from engine.ensemble import batched_energy, perturbed, run_ensemble
+from engine.gravity import direct_accelerations
+from engine.integrators import INTEGRATORS, run_system
+from engine.particle_mesh import ParticleMesh
+from engine.presets import PRESETS, preset_arrays, preset_system
+from engine.recorder import TrajectoryRecorder
+
+SOLVERS = {
+    "direct": lambda: direct_accelerations,
+    "barnes-hut": lambda: BarnesHut(theta=0.5),
+    "particle-mesh": lambda: ParticleMesh(grid_size=256, softening=1.0),
+}
+
+# Steps per integrator call in `run`, so progress can be reported
+PROGRESS_STEPS = 10_000
+
+
+def energy(system):
+    return float(batched_energy(*(getattr(system, field)[None] for field in ("x", "y", "vx", "vy", "mass")))[0])
+
+
+def run(args):
+    system = preset_system(args.preset, trail_length=1)
+    integrator = INTEGRATORS[args.integrator]
+    solver = SOLVERS[args.solver]()
+    steps = args.steps if args.time is None else int(np.ceil(args.time / args.dt))
+
+    recorder = None
+    batch = PROGRESS_STEPS
+    if args.record:
+        frames = -(-steps // args.record_every) + 1  # Every batch end, plus the initial state
+        recorder = TrajectoryRecorder(args.record, system, frames)
+        recorder.record(0.0, system.x, system.y)
+        batch = args.record_every
+
+    energy0 = energy(system)
+    start = time.perf_counter()
+    done = 0
+    while done < steps:
+        chunk = min(batch, steps - done)
+        run_system(system, args.dt, chunk, integrator, solver)
+        done += chunk
+        if recorder:
+            recorder.record(done * args.dt, system.x, system.y)
+        if steps > PROGRESS_STEPS and done % PROGRESS_STEPS < chunk:
+            print(f"\r{done:,}/{steps:,} steps", end="", file=sys.stderr)
+    if steps > PROGRESS_STEPS:
+        print(file=sys.stderr)
+    wall = time.perf_counter() - start
+
+    print(f"{args.preset}: {steps:,} steps of {args.dt:g} s with {integrator.name} / {args.solver}")
+    print(f"Simulated {steps * args.dt:.6g} s in {wall:.3f} s ({steps / max(wall, 1e-9):,.0f} steps/s)")
+    print(f"Relative energy error {abs((energy(system) - energy0) / energy0):.3e}")
+    print(f"{'body':>4} {'x':>14} {'y':>14} {'vx':>12} {'vy':>12}")
+    for i, body in enumerate(system):
+        print(f"{i:>4} {body.x:>14.6e} {body.y:>14.6e} {body.vx:>12.4f} {body.vy:>12.4f}")
+
+    if recorder:
+        print(f"Recorded {recorder.count:,} frames to {args.record}")
+        recorder.close()
+    if args.output:
+        state = {field: getattr(system, field).copy() for field in ("x", "y", "vx", "vy", "mass")}
+        if args.output.endswith(".csv"):
+            np.savetxt(args.output, np.column_stack(list(state.values())), delimiter=",",
+                       header=",".join(state), comments="")
+        else:
+            np.savez(args.output, time=steps * args.dt, **state)
+        print(f"Final state written to {args.output}")
+
+
+def ensemble(args):
+    x, y, vx, vy, mass = preset_arrays(args.preset)
+    members = perturbed(x, y, vx, vy, args.members, args.perturbation, args.seed)
+    start = time.perf_counter()
+    result = run_ensemble(*members, mass, args.dt, args.steps, args.integrator, processes=args.processes)
+    wall = time.perf_counter() - start
+
+    ejected = result["ejected"] >= 0
+    print(f"{args.preset}: {args.members} members x {args.steps:,} steps of {args.dt:g} s in {wall:.2f} s")
+    print(f"Ejections: {ejected.sum()} ({ejected.mean():.1%})")
+    if ejected.any():
+        times = result["ejection_time"][ejected]
+        print(f"Ejection time: median {np.median(times):.4g} s, min {times.min():.4g} s, max {times.max():.4g} s")
+        for body in range(len(x)):
+            print(f"  body {body} escaped in {(result['ejected'] == body).sum()} members")
+    drift = result["energy_drift"]
+    print(f"Energy drift: median {np.median(drift):.3e}, max {drift.max():.3e}")
+    if args.output:
+        np.savez(args.output, **result)
+        print(f"Per-member results written to {args.output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m engine", description="Headless orbital simulations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list the presets, integrators and solvers")
+
+    run_parser = commands.add_parser("run", help="integrate one preset at full speed")
+    run_parser.add_argument("preset", choices=PRESETS)
+    length = run_parser.add_mutually_exclusive_group()
+    length.add_argument("--steps", type=int, default=10_000, help="number of steps (default 10000)")
+    length.add_argument("--time", type=float, help="simulated seconds instead of --steps")
+    run_parser.add_argument("--dt", type=float, default=3600.0, help="time step in seconds")
+    run_parser.add_argument("--integrator", choices=INTEGRATORS, default="verlet")
+    run_parser.add_argument("--solver", choices=SOLVERS, default="direct")
+    run_parser.add_argument("--output", help="write the final state to a .npz or .csv file")
+    run_parser.add_argument("--record", help="record the trajectory to a file for playback (V in whole.py)")
+    run_parser.add_argument("--record-every", type=int, default=100, help="steps between recorded frames")
+
+    ensemble_parser = commands.add_parser("ensemble", help="integrate perturbed copies of a preset")
+    ensemble_parser.add_argument("preset", choices=PRESETS)
+    ensemble_parser.add_argument("--members", type=int, default=1000)
+    ensemble_parser.add_argument("--steps", type=int, default=10_000)
+    ensemble_parser.add_argument("--dt", type=float, default=3600.0)
+    ensemble_parser.add_argument("--integrator", choices=INTEGRATORS, default="verlet")
+    ensemble_parser.add_argument("--perturbation", type=float, default=1e-6, help="relative size of the noise")
+    ensemble_parser.add_argument("--seed", type=int, default=0)
+    ensemble_parser.add_argument("--processes", type=int, default=1)
+    ensemble_parser.add_argument("--output", help="write per-member results to a .npz file")
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        print("Presets:     " + ", ".join(f"{name} ({len(bodies)} bodies)" for name, bodies in PRESETS.items()))
+        print("Integrators: " + ", ".join(INTEGRATORS))
+        print("Solvers:     " + ", ".join(SOLVERS))
+    elif args.command == "run":
+        run(args)
+    else:
+        ensemble(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Barnes-Hut quadtree gravity solver.
+
+The tree is a linear quadtree: bodies are sorted by Morton code and every
+level stores the mass, centre of mass and body count of its occupied cells.
+The walk is breadth first and vectorized over all (target, cell) pairs of a
+level at once, so there is no per-node Python recursion.
+"""
+
+import numpy as np
+
+from engine.gravity import G, direct_accelerations, error_summary, field_accelerations
+
+
+def _spread_bits(v):
+    """Interleaves zeros between the low 32 bits of v (for Morton codes)."""
+    v = v & 0xFFFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    v = (v | (v << 1)) & 0x5555555555555555
+    return v
+
+
+class _Level:
+    def __init__(self, mass, com_x, com_y, offset, count, body_cell):
+        self.mass = mass
+        self.com_x = com_x
+        self.com_y = com_y
+        self.offset = offset  # Distance from the cell centre to its centre of mass
+        self.count = count
+        self.body_cell = body_cell  # Cell index of every body at this level
+        self.child_start = None
+        self.child_end = None
+
+
+# Arrays of a level in the order BarnesHut.flatten() lists them; the
+# deepest level has no children
+_LEVEL_FIELDS = ("mass", "com_x", "com_y", "offset", "count", "body_cell", "child_start", "child_end")
+
+
+class BarnesHut:
+    """Approximate gravity solver; call it like direct_accelerations.
+
+    theta is the opening angle: a cell of width s at distance d from a
+    target is treated as a point mass when s / (d - delta) < theta, where
+    delta is the offset of the centre of mass from the cell centre.
+    theta = 0 gives the direct sum, larger values are faster and less
+    accurate.
+    """
+
+    def __init__(self, theta=0.5, max_depth=20, softening=0.0, chunk=4096):
+        self.theta = theta
+        self.max_depth = max_depth
+        self.softening = softening
+        self.chunk = chunk
+
+    def build(self, x, y, mass):
+        """Builds the quadtree levels for the given bodies."""
+        n = len(x)
+        x0, y0 = x.min(), y.min()
+        size = max(x.max() - x0, y.max() - y0)
+        size = size * (1 + 1e-9) if size > 0 else 1.0
+        depth = self.max_depth
+        side = 1 << depth
+        ix = np.minimum(((x - x0) / size * side).astype(np.int64), side - 1)
+        iy = np.minimum(((y - y0) / size * side).astype(np.int64), side - 1)
+        codes = _spread_bits(ix) | (_spread_bits(iy) << 1)
+
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        levels = []
+        for level in range(depth + 1):
+            keys = sorted_codes >> (2 * (depth - level))
+            new_cell = np.empty(n, bool)
+            new_cell[0] = True
+            np.not_equal(keys[1:], keys[:-1], out=new_cell[1:])
+            cell_sorted = np.cumsum(new_cell) - 1
+            body_cell = np.empty(n, np.int64)
+            body_cell[order] = cell_sorted
+            cells = cell_sorted[-1] + 1
+            count = np.bincount(body_cell, minlength=cells)
+            m = np.bincount(body_cell, mass, cells)
+            # Massless cells (test particles) fall back to the geometric mean
+            safe = np.where(m > 0, m, count)
+            wx = np.where(m[body_cell] > 0, mass, 1.0) * x
+            wy = np.where(m[body_cell] > 0, mass, 1.0) * y
+            com_x = np.bincount(body_cell, wx, cells) / safe
+            com_y = np.bincount(body_cell, wy, cells) / safe
+            width = size / (1 << level)
+            first = order[new_cell]
+            shift = depth - level
+            centre_x = x0 + ((ix[first] >> shift) + 0.5) * width
+            centre_y = y0 + ((iy[first] >> shift) + 0.5) * width
+            offset = np.hypot(com_x - centre_x, com_y - centre_y)
+            levels.append(_Level(m, com_x, com_y, offset, count, body_cell))
+            if level > 0:
+                parent = levels[level - 1]
+                # Children of a cell are contiguous because cells are key-sorted
+                parent_of = parent.body_cell[order][new_cell]
+                cell_ids = np.arange(len(parent.mass))
+                parent.child_start = np.searchsorted(parent_of, cell_ids)
+                parent.child_end = np.searchsorted(parent_of, cell_ids, "right")
+            if cells == n:
+                break  # Every body has its own cell, deeper levels add nothing
+        return levels, size
+
+    def flatten(self, tree):
+        """Splits a tree from build() into (layout, list of arrays).
+
+        The arrays may be copied anywhere, such as into shared memory;
+        unflatten() rebuilds the tree around them without copying.
+        """
+        levels, size = tree
+        arrays = [getattr(level, field) for level in levels for field in _LEVEL_FIELDS]
+        return (size, len(levels)), [array for array in arrays if array is not None]
+
+    def unflatten(self, layout, arrays):
+        """The tree of flatten()'s layout and arrays, for evaluate()."""
+        size, depth = layout
+        arrays = iter(arrays)
+        levels = []
+        for level in range(depth):
+            levels.append(_Level(*(next(arrays) for _ in range(6))))
+            if level < depth - 1:
+                levels[-1].child_start, levels[-1].child_end = next(arrays), next(arrays)
+        return levels, size
+
+    def __call__(self, x, y, mass, targets=None):
+        """Returns (ax, ay) for the bodies in `targets` (default: all)."""
+        if len(x) < 2:
+            return np.zeros(len(x)), np.zeros(len(x))
+        return self.evaluate(self.build(x, y, mass), x, y, mass, targets)
+
+    def evaluate(self, tree, x, y, mass, targets=None):
+        """Like calling the solver, but walks a tree already returned by build()."""
+        levels, size = tree
+        if targets is None:
+            targets = np.arange(len(x))
+        ax = np.zeros(len(targets))
+        ay = np.zeros(len(targets))
+        for start in range(0, len(targets), self.chunk):
+            stop = start + self.chunk
+            ax[start:stop], ay[start:stop] = self._walk(
+                levels, size, x, y, mass, targets[start:stop])
+        return ax, ay
+
+    def _walk(self, levels, size, x, y, mass, targets):
+        n_targets = len(targets)
+        ax = np.zeros(n_targets)
+        ay = np.zeros(n_targets)
+        slot = np.arange(n_targets)  # Position of each pair's target in `targets`
+        cell = np.zeros(n_targets, np.int64)
+        theta2 = self.theta * self.theta
+        eps2 = self.softening * self.softening
+        last = len(levels) - 1
+        for depth, level in enumerate(levels):
+            body = targets[slot]
+            m = level.mass[cell]
+            dx = level.com_x[cell] - x[body]
+            dy = level.com_y[cell] - y[body]
+            own = level.body_cell[body] == cell
+            leaf = (level.count[cell] == 1) | (depth == last)
+            width = size / (1 << depth)
+            r2 = dx * dx + dy * dy
+            reach = np.sqrt(r2) - level.offset[cell]
+            far = (reach > 0) & (width * width < theta2 * reach * reach)
+            accept = leaf | (~own & far)
+
+            # A leaf holding the target itself acts with the target removed
+            own_leaf = own & accept
+            if own_leaf.any():
+                rest = m[own_leaf] - mass[body[own_leaf]]
+                safe = np.where(rest > 0, rest, 1.0)
+                cx = level.com_x[cell[own_leaf]] * m[own_leaf] - x[body[own_leaf]] * mass[body[own_leaf]]
+                cy = level.com_y[cell[own_leaf]] * m[own_leaf] - y[body[own_leaf]] * mass[body[own_leaf]]
+                dx[own_leaf] = np.where(rest > 0, cx / safe, x[body[own_leaf]]) - x[body[own_leaf]]
+                dy[own_leaf] = np.where(rest > 0, cy / safe, y[body[own_leaf]]) - y[body[own_leaf]]
+                m[own_leaf] = np.maximum(rest, 0.0)
+                r2 = dx * dx + dy * dy
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                w = np.where(accept & (r2 > 0), G * m * (r2 + eps2) ** -1.5, 0.0)
+            ax += np.bincount(slot, w * dx, n_targets)
+            ay += np.bincount(slot, w * dy, n_targets)
+
+            opened = ~accept
+            if not opened.any():
+                break
+            parents = cell[opened]
+            first = level.child_start[parents]
+            counts = level.child_end[parents] - first
+            slot = np.repeat(slot[opened], counts)
+            offsets = np.arange(len(slot)) - np.repeat(np.cumsum(counts) - counts, counts)
+            cell = np.repeat(first, counts) + offsets
+        return ax, ay
+
+    def force_error(self, x, y, mass, sample=512, seed=0):
+        """Compares against direct summation on a random sample of bodies.
+
+        Returns a dict with the median, 99th percentile and maximum
+        relative acceleration error, which is what to look at when
+        choosing theta.
+        """
+        n = len(x)
+        rng = np.random.default_rng(seed)
+        targets = np.arange(n) if n <= sample else rng.choice(n, sample, replace=False)
+        ax, ay = self(x, y, mass, targets)
+        if n <= sample:
+            ex, ey = direct_accelerations(x, y, mass)
+        else:
+            ex, ey = field_accelerations(x[targets], y[targets], x, y, mass, self.softening)
+        return dict(theta=self.theta, **error_summary(ax, ay, ex, ey))
@@ -0,0 +1,172 @@
+"""Struct-of-arrays storage for celestial bodies.
+
+Every attribute lives in one contiguous array, so the physics works on
+whole arrays instead of walking objects. Arrays grow by doubling, and
+removal swaps the last body into the freed slot, so adding or removing a
+body at runtime is amortized O(1). Trails live in one shared TrailBuffer
+indexed by the same slots. BodyView objects give per-body
+attribute access for code that deals with one body at a time, such as
+click handling and the locked camera.
+"""
+
+import numpy as np
+
+from engine.trails import TrailBuffer
+
+_FLOAT_FIELDS = ("x", "y", "vx", "vy", "ax", "ay", "mass", "radius")
+
+
+class BodySystem:
+    """A growable set of bodies stored as parallel arrays.
+
+    The x, y, vx, vy, ax, ay, mass, radius and color properties return
+    array views of the live bodies; writing into them updates the bodies.
+    Iterating yields a BodyView per body.
+    """
+
+    def __init__(self, capacity=8, trail_length=200):
+        self.count = 0
+        self.trail_length = trail_length
+        self._arrays = {name: np.zeros(capacity) for name in _FLOAT_FIELDS}
+        self._color = np.zeros((capacity, 3), np.uint8)
+        self._ids = np.zeros(capacity, np.int64)
+        self.trails = TrailBuffer(capacity, trail_length)
+        self._slots = {}  # Body id -> current slot
+        self._views = {}  # Body id -> its BodyView
+        self._next_id = 0
+
+    @classmethod
+    def from_bodies(cls, bodies, trail_length=200):
+        """Builds a system from objects with x, y, vx, vy, mass, radius, color."""
+        system = cls(max(8, len(bodies)), trail_length)
+        for body in bodies:
+            system.add(body.x, body.y, body.vx, body.vy, body.mass, body.radius, body.color)
+        return system
+
+    @classmethod
+    def from_arrays(cls, x, y, vx, vy, mass, radius, color, trail_length=200):
+        """Builds a system from per-field arrays (color is (N, 3)) in bulk."""
+        n = len(x)
+        system = cls(max(8, n), trail_length)
+        for name, values in zip(("x", "y", "vx", "vy", "mass", "radius"), (x, y, vx, vy, mass, radius)):
+            system._arrays[name][:n] = values
+        system._color[:n] = color
+        system._ids[:n] = np.arange(n)
+        system._slots = dict(zip(range(n), range(n)))
+        system._next_id = n
+        system.count = n
+        return system
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter([self._view(int(body_id)) for body_id in self._ids[:self.count]])
+
+    def __getitem__(self, slot):
+        if not -self.count <= slot < self.count:
+            raise IndexError("body index out of range")
+        return self._view(int(self._ids[slot % self.count]))
+
+    def _view(self, body_id):
+        if body_id not in self._views:
+            self._views[body_id] = BodyView(self, body_id)
+        return self._views[body_id]
+
+    def _grow(self):
+        capacity = 2 * len(self._ids)
+        for name, array in self._arrays.items():
+            self._arrays[name] = np.resize(array, capacity)
+        self._color = np.resize(self._color, (capacity, 3))
+        self._ids = np.resize(self._ids, capacity)
+        self.trails.resize(capacity)
+
+    def add(self, x, y, vx, vy, mass, radius, color):
+        """Appends a body and returns its view."""
+        if self.count == len(self._ids):
+            self._grow()
+        slot = self.count
+        for name, value in zip(_FLOAT_FIELDS, (x, y, vx, vy, 0.0, 0.0, mass, radius)):
+            self._arrays[name][slot] = value
+        self._color[slot] = color[:3]
+        body_id = self._next_id
+        self._next_id += 1
+        self._ids[slot] = body_id
+        self._slots[body_id] = slot
+        self.trails.clear(slot)
+        self.count += 1
+        return self._view(body_id)
+
+    def remove(self, body):
+        """Removes a body (a BodyView) by moving the last body into its slot."""
+        slot = self._slots.pop(body.id)
+        last = self.count - 1
+        if slot != last:
+            for array in self._arrays.values():
+                array[slot] = array[last]
+            self._color[slot] = self._color[last]
+            moved = int(self._ids[last])
+            self._ids[slot] = moved
+            self._slots[moved] = slot
+            self.trails.move(last, slot)
+        self._views.pop(body.id, None)
+        self.count -= 1
+
+    def clear(self):
+        for body in list(self):
+            self.remove(body)
+
+    def clear_trails(self):
+        self.trails.clear()
+
+    def record_trails(self, scale=None):
+        """Appends every body's current position to its trail (see TrailBuffer.append)."""
+        self.trails.append(self.x, self.y, scale)
+
+    def slot(self, body):
+        return self._slots[body.id]
+
+    @property
+    def color(self):
+        return self._color[:self.count]
+
+
+def _array_property(name):
+    return property(lambda self: self._arrays[name][:self.count])
+
+
+for _name in _FLOAT_FIELDS:
+    setattr(BodySystem, _name, _array_property(_name))
+
+
+class BodyView:
+    """Attribute access to one body of a BodySystem, stable across removals."""
+
+    __slots__ = ("system", "id")
+
+    def __init__(self, system, body_id):
+        self.system = system
+        self.id = body_id
+
+    @property
+    def color(self):
+        return tuple(int(c) for c in self.system.color[self.system.slot(self)])
+
+    @property
+    def trail(self):
+        """The body's trail points, oldest first, as a (count, 2) array."""
+        return self.system.trails.trail(self.system.slot(self))
+
+
+def _view_property(name):
+    def get(self):
+        return float(self.system._arrays[name][self.system.slot(self)])
+
+    def set(self, value):
+        self.system._arrays[name][self.system.slot(self)] = value
+
+    return property(get, set)
+
+
+for _name in _FLOAT_FIELDS:
+    setattr(BodyView, _name, _view_property(_name))
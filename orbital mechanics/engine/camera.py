@@ -0,0 +1,61 @@
+"""Per-frame world-to-screen projection of all bodies at once.
+
+Projection transforms every body to screen coordinates in one batched
+operation, drops the bodies whose discs lie outside the viewport, and
+merges bodies whose centres fall into the same pixel into a single disc
+(the largest of them), so the number of draws is bounded by the number
+of visible pixels rather than the number of bodies. It also picks the
+body under the mouse without walking the bodies one by one.
+"""
+
+import numpy as np
+
+MIN_RADIUS = 2  # Smallest drawn disc, in pixels
+PICK_RADIUS = 5  # Smallest click target, in pixels
+
+
+class Projection:
+    """Screen positions and disc radii of bodies for one frame.
+
+    x, y are the projected centres (floats, all bodies), radius the
+    drawn radii in pixels, and visible the indices of the bodies whose
+    discs overlap the width x height viewport.
+    """
+
+    def __init__(self, x, y, radius, scale, visual_scale, offset_x, offset_y, width, height):
+        self.x = x * scale + offset_x
+        self.y = y * scale + offset_y
+        self.radius = np.maximum(MIN_RADIUS, (radius * visual_scale).astype(np.int64))
+        self.visible = np.flatnonzero((self.x + self.radius >= 0) & (self.x - self.radius < width)
+                                      & (self.y + self.radius >= 0) & (self.y - self.radius < height))
+
+    def discs(self):
+        """The discs to draw: (indices, px, py, radius) with one disc per occupied pixel.
+
+        Where several visible bodies share a pixel, the one with the
+        largest radius stands for all of them.
+        """
+        indices = self.visible
+        px = np.floor(self.x[indices]).astype(np.int64)
+        py = np.floor(self.y[indices]).astype(np.int64)
+        if len(indices) > 1:
+            # One integer sort key: the pixel, then the largest disc first within it
+            radius = self.radius[indices]
+            largest = radius.max()
+            pixel = (px - px.min()) * (py.max() - py.min() + 1) + (py - py.min())
+            order = np.argsort(pixel * (largest + 1) + (largest - radius))
+            pixel = pixel[order]
+            first = np.ones(len(order), bool)
+            first[1:] = pixel[1:] != pixel[:-1]
+            order = order[first]
+            indices, px, py = indices[order], px[order], py[order]
+        return indices, px, py, self.radius[indices]
+
+    def pick(self, mouse_x, mouse_y):
+        """Index of the body nearest the cursor among those drawn under it, or None."""
+        distance = (self.x - mouse_x) ** 2 + (self.y - mouse_y) ** 2
+        hit = distance <= np.maximum(PICK_RADIUS, self.radius) ** 2
+        if not hit.any():
+            return None
+        candidates = np.flatnonzero(hit)
+        return int(candidates[np.argmin(distance[candidates])])
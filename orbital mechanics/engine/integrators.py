@@ -0,0 +1,216 @@
+"""Symplectic integrators over body arrays, selectable by name.
+
+The fixed-step schemes are sequences of drift (x += v * w * dt) and kick
+(v += a * w * dt) operations. Every integrator's step() updates x, y, vx,
+vy in place, calling accel(x, y, mass) -> (ax, ay) for accelerations,
+reset() drops any history kept between steps, history() returns a copy
+of it (None if there is nothing a restart would change) and
+restore(history) puts such a copy back.
+"""
+
+import inspect
+import time
+
+import numpy as np
+
+from engine import kernels
+from engine.gravity import direct_accelerations
+from engine.ias15 import IAS15
+from engine.wisdom_holman import WisdomHolman
+
+# Yoshida / Forest-Ruth 4th-order coefficients
+_W1 = 1 / (2 - 2 ** (1 / 3))
+_W0 = -(2 ** (1 / 3)) * _W1
+
+
+class SplittingIntegrator:
+    """A drift/kick composition such as leapfrog or Yoshida.
+
+    max_dt is the largest step the S key may reach with this scheme
+    (seconds); higher-order schemes tolerate larger steps for the same
+    energy error.
+
+    A sequence that starts and ends with a kick (velocity Verlet) is
+    first-same-as-last: the closing kick's accelerations are kept and
+    reused by the next opening kick, so a step costs one force
+    evaluation. They are only reused with the solver that computed them
+    (accel, or the solver it wraps as accel.__wrapped__) and while
+    positions and masses are exactly those they were computed at;
+    reset() drops them.
+    """
+
+    def __init__(self, name, sequence, max_dt):
+        self.name = name
+        self.sequence = sequence  # ("drift" | "kick", fraction of dt) pairs
+        self.max_dt = max_dt
+        self.fsal = len(sequence) > 1 and sequence[0][0] == sequence[-1][0] == "kick"
+        self._last = None  # (solver, x, y, mass, ax, ay) of the last closing kick
+
+    def reset(self):
+        """Drops the accelerations kept for the next opening kick."""
+        self._last = None
+
+    def history(self):
+        """None: accelerations dropped by reset() are recomputed bit for bit."""
+        return None
+
+    def restore(self, history):
+        self._last = None
+
+    def last_accelerations(self, x, y, mass, accel):
+        """The last closing kick's (ax, ay) if still valid for this state and solver, else None."""
+        last = self._last
+        if last is None or last[0] is not inspect.unwrap(accel) or len(last[1]) != len(x):
+            return None
+        if not (np.array_equal(last[1], x) and np.array_equal(last[2], y) and np.array_equal(last[3], mass)):
+            return None
+        return last[4], last[5]
+
+    def keep_accelerations(self, x, y, mass, ax, ay, accel):
+        """Keeps the closing kick's accelerations for the next step, if first-same-as-last."""
+        if self.fsal:
+            self._last = (inspect.unwrap(accel), x.copy(), y.copy(), mass.copy(),
+                          np.array(ax, float), np.array(ay, float))
+
+    def step(self, x, y, vx, vy, mass, dt, accel):
+        """Advances the state arrays by dt in place."""
+        reused = self.last_accelerations(x, y, mass, accel) if self.fsal else None
+        for k, (operation, weight) in enumerate(self.sequence):
+            h = weight * dt
+            if operation == "drift":
+                x += vx * h
+                y += vy * h
+            else:
+                ax, ay = reused if k == 0 and reused is not None else accel(x, y, mass)
+                vx += ax * h
+                vy += ay * h
+        self.keep_accelerations(x, y, mass, ax, ay, accel)
+
+
+INTEGRATORS = {
+    # Semi-implicit Euler, the original CelestialBody.update_position scheme
+    "euler": SplittingIntegrator("euler", [("kick", 1.0), ("drift", 1.0)], 86400),
+    # Drift-kick-drift leapfrog
+    "leapfrog": SplittingIntegrator(
+        "leapfrog", [("drift", 0.5), ("kick", 1.0), ("drift", 0.5)], 4 * 86400),
+    # Kick-drift-kick velocity Verlet
+    "verlet": SplittingIntegrator(
+        "verlet", [("kick", 0.5), ("drift", 1.0), ("kick", 0.5)], 4 * 86400),
+    "yoshida4": SplittingIntegrator(
+        "yoshida4",
+        [("drift", _W1 / 2), ("kick", _W1), ("drift", (_W0 + _W1) / 2), ("kick", _W0),
+         ("drift", (_W0 + _W1) / 2), ("kick", _W1), ("drift", _W1 / 2)],
+        10 * 86400),
+    # Adaptive Gauss-Radau, for close encounters in the three-body presets
+    "ias15": IAS15(),
+    # Analytic Kepler drift plus interaction kick, for planets with moons
+    "wisdom-holman": WisdomHolman(),
+}
+
+
+def gather_state(bodies):
+    """Copies x, y, vx, vy and mass of a list of bodies into float arrays."""
+    return tuple(
+        np.fromiter((getattr(body, name) for body in bodies), float, len(bodies))
+        for name in ("x", "y", "vx", "vy", "mass")
+    )
+
+
+def advance_bodies(bodies, dt, integrator, solver):
+    """Steps a list of CelestialBody objects."""
+    x, y, vx, vy, mass = gather_state(bodies)
+    integrator.step(x, y, vx, vy, mass, dt, solver)
+    for i, body in enumerate(bodies):
+        body.x = float(x[i])
+        body.y = float(y[i])
+        body.vx = float(vx[i])
+        body.vy = float(vy[i])
+
+
+def _fused_steps(system, dt, steps, integrator):
+    """Runs a splitting scheme in the compiled kernel, with the same force reuse as step()."""
+    reused = None
+    if integrator.fsal:
+        reused = integrator.last_accelerations(system.x, system.y, system.mass, direct_accelerations)
+    if reused is not None:
+        system.ax[:], system.ay[:] = reused
+    kernels.fused_steps(integrator.sequence, system.x, system.y, system.vx, system.vy,
+                        system.mass, system.ax, system.ay, dt, steps, reused is not None)
+    integrator.keep_accelerations(system.x, system.y, system.mass, system.ax, system.ay, direct_accelerations)
+
+
+def advance_system(system, dt, integrator, solver):
+    """Steps a BodySystem in place and records its trails.
+
+    A splitting scheme over the direct sum runs as one compiled kernel
+    when Numba is installed.
+    """
+    if not len(system):
+        return
+    if kernels.AVAILABLE and solver is direct_accelerations and isinstance(integrator, SplittingIntegrator):
+        _fused_steps(system, dt, 1, integrator)
+        system.record_trails()
+        return
+
+    def accel(x, y, mass):
+        ax, ay = solver(x, y, mass)
+        if len(ax) == len(system):
+            system.ax[:] = ax
+            system.ay[:] = ay
+        return ax, ay
+
+    accel.__wrapped__ = solver  # Forces kept by a splitting scheme are matched on the solver
+    integrator.step(system.x, system.y, system.vx, system.vy, system.mass, dt, accel)
+    system.record_trails()
+
+
+def run_system(system, dt, steps, integrator, solver):
+    """Advances a BodySystem by steps fixed steps at full speed, without trails.
+
+    A splitting scheme over the direct sum runs all steps in one compiled
+    call when Numba is installed.
+    """
+    if not len(system):
+        return
+    if kernels.AVAILABLE and solver is direct_accelerations and isinstance(integrator, SplittingIntegrator):
+        _fused_steps(system, dt, steps, integrator)
+        return
+    for _ in range(steps):
+        integrator.step(system.x, system.y, system.vx, system.vy, system.mass, dt, solver)
+
+
+def advance_by(system, duration, dt, integrator, solver, tracers=None, progress=None, batch_time=0.05):
+    """Advances a BodySystem (and tracers around it) by duration seconds, without trails.
+
+    Steps are dt long except for a shorter final one. Work is done in
+    batches of about batch_time seconds of wall time, each as one
+    run_system call when there are no tracers; progress(seconds_done)
+    is called after every batch.
+    """
+    steps, remainder = divmod(duration, dt)
+    steps = int(steps)
+    batch = 16
+    done = 0
+    while done < steps:
+        count = min(batch, steps - done)
+        start = time.perf_counter()
+        if tracers is not None and len(tracers):
+            for _ in range(count):
+                before = (system.x.copy(), system.y.copy(), system.mass.copy())
+                integrator.step(system.x, system.y, system.vx, system.vy, system.mass, dt, solver)
+                tracers.advance(dt, before, (system.x, system.y, system.mass))
+        else:
+            run_system(system, dt, count, integrator, solver)
+        done += count
+        # Size the next batch to the time budget from this one's speed
+        elapsed = time.perf_counter() - start
+        batch = max(1, int(count * min(4.0, batch_time / max(elapsed, 1e-6))))
+        if progress:
+            progress(done * dt)
+    if remainder > 0 and len(system):
+        before = (system.x.copy(), system.y.copy(), system.mass.copy())
+        integrator.step(system.x, system.y, system.vx, system.vy, system.mass, remainder, solver)
+        if tracers is not None and len(tracers):
+            tracers.advance(remainder, before, (system.x, system.y, system.mass))
+    if progress:
+        progress(duration)
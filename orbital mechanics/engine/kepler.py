@@ -0,0 +1,61 @@
+"""Vectorized two-body (Kepler) propagation in universal variables."""
+
+import numpy as np
+
+
+def stumpff(z):
+    """Returns the Stumpff functions C(z) and S(z) for an array z."""
+    c = np.empty_like(z)
+    s = np.empty_like(z)
+    pos = z > 1e-6
+    neg = z < -1e-6
+    mid = ~(pos | neg)
+    sz = np.sqrt(z[pos])
+    c[pos] = (1 - np.cos(sz)) / z[pos]
+    s[pos] = (sz - np.sin(sz)) / sz ** 3
+    sz = np.sqrt(-z[neg])
+    c[neg] = (np.cosh(sz) - 1) / -z[neg]
+    s[neg] = (np.sinh(sz) - sz) / sz ** 3
+    zm = z[mid]
+    c[mid] = 1 / 2 - zm / 24 + zm * zm / 720
+    s[mid] = 1 / 6 - zm / 120 + zm * zm / 5040
+    return c, s
+
+
+def kepler_drift(rx, ry, vx, vy, mu, dt, tolerance=1e-13, max_iterations=50):
+    """Propagates relative two-body states by dt; returns (rx, ry, vx, vy).
+
+    mu is G * (m1 + m2) per orbit. Works for elliptic, parabolic and
+    hyperbolic orbits; bound orbits are first reduced modulo their period.
+    """
+    r0 = np.hypot(rx, ry)
+    v2 = vx * vx + vy * vy
+    sqrt_mu = np.sqrt(mu)
+    rv = (rx * vx + ry * vy) / sqrt_mu  # r0 * vr0 / sqrt(mu)
+    alpha = 2 / r0 - v2 / mu
+    dt = np.broadcast_to(dt, r0.shape).astype(float)
+    bound = alpha > 0
+    period = np.where(bound, 2 * np.pi / (sqrt_mu * np.abs(alpha) ** 1.5), np.inf)
+    dt = np.where(bound, np.fmod(dt, period), dt)
+
+    chi = np.where(bound, sqrt_mu * alpha * dt, sqrt_mu * dt / r0)
+    for _ in range(max_iterations):
+        z = alpha * chi * chi
+        c, s = stumpff(z)
+        f = rv * chi * chi * c + (1 - alpha * r0) * chi ** 3 * s + r0 * chi - sqrt_mu * dt
+        df = rv * chi * (1 - z * s) + (1 - alpha * r0) * chi * chi * c + r0
+        delta = f / df
+        chi = chi - delta
+        if np.all(np.abs(delta) <= tolerance * np.maximum(np.abs(chi), 1.0)):
+            break
+
+    z = alpha * chi * chi
+    c, s = stumpff(z)
+    f = 1 - chi * chi / r0 * c
+    g = dt - chi ** 3 * s / sqrt_mu
+    new_rx = f * rx + g * vx
+    new_ry = f * ry + g * vy
+    r = np.hypot(new_rx, new_ry)
+    fdot = sqrt_mu / (r * r0) * (z * s - 1) * chi
+    gdot = 1 - chi * chi / r * c
+    return new_rx, new_ry, fdot * rx + gdot * vx, fdot * ry + gdot * vy
@@ -0,0 +1,156 @@
+"""Force evaluation split across a persistent pool of worker processes.
+
+Positions and masses are written once into a multiprocessing shared
+memory block. Each worker maps the block (no copying or pickling of the
+arrays), evaluates the accelerations of one contiguous chunk of target
+bodies and writes them back into the same block. Any solver taking a
+`targets` index array works; by default the chunks are evaluated with the
+direct sum. A tree solver such as BarnesHut (build(), evaluate(),
+flatten() and unflatten()) has its tree built once per evaluation in
+this process and its arrays written after the bodies in the same block,
+so the workers only walk it.
+"""
+
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine.gravity import field_accelerations
+
+# Rows of the shared block: inputs x, y, mass and outputs ax, ay. The
+# flattened tree of a tree solver follows them.
+_FIELDS = ("x", "y", "mass", "ax", "ay")
+
+# Forked workers inherit the imported modules; spawned ones would re-run
+# the importing script, which for the pygame scripts opens a window
+_START_METHOD = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+
+# Shared block mapped by this worker process: (name, SharedMemory)
+_attached = [None, None]
+
+
+def direct_targets(x, y, mass, targets):
+    """Direct-sum accelerations of the bodies in `targets` due to all bodies."""
+    return field_accelerations(x[targets], y[targets], x, y, mass)
+
+
+def _views(buffer, capacity, n):
+    block = np.ndarray((len(_FIELDS), capacity), float, buffer)
+    return {name: block[row, :n] for row, name in enumerate(_FIELDS)}
+
+
+def _tree_views(buffer, capacity, specs):
+    """The flattened tree arrays after the rows, from (dtype, length) specs."""
+    arrays = []
+    offset = len(_FIELDS) * capacity * 8
+    for dtype, length in specs:
+        arrays.append(np.ndarray(length, dtype, buffer, offset))
+        offset += _words(arrays[-1].nbytes) * 8
+    return arrays
+
+
+def _words(nbytes):
+    return -(-nbytes // 8)  # Rounded up, keeping every array 8-byte aligned
+
+
+def _evaluate(name, capacity, n, start, stop, solver, tree):
+    """Worker task: accelerations of bodies start..stop, written in place."""
+    if _attached[0] != name:
+        if _attached[1] is not None:
+            _attached[1].close()
+        try:
+            # The parent owns the block and unlinks it
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13; forked workers share the parent's tracker
+            memory = shared_memory.SharedMemory(name=name)
+        _attached[:] = name, memory
+    arrays = _views(_attached[1].buf, capacity, n)
+    x, y, mass = arrays["x"], arrays["y"], arrays["mass"]
+    targets = np.arange(start, stop)
+    if tree is not None:
+        layout, specs = tree
+        tree = solver.unflatten(layout, _tree_views(_attached[1].buf, capacity, specs))
+        ax, ay = solver.evaluate(tree, x, y, mass, targets)
+    else:
+        ax, ay = solver(x, y, mass, targets)
+    arrays["ax"][start:stop] = ax
+    arrays["ay"][start:stop] = ay
+
+
+class ParallelSolver:
+    """Wraps a targeted solver to evaluate chunks of bodies on all cores.
+
+    solver(x, y, mass, targets) -> (ax, ay) is run in every worker for
+    its chunk; a tree solver's tree is built here once per call and
+    walked by every worker. Below min_bodies, or with a single worker,
+    the solver runs in this process. The pool is started on first use
+    and lives until close().
+    """
+
+    def __init__(self, solver=direct_targets, workers=None, min_bodies=4096, chunks_per_worker=4):
+        self.solver = solver
+        self.workers = workers or os.cpu_count() or 1
+        self.min_bodies = min_bodies
+        self.chunks_per_worker = chunks_per_worker
+        self._pool = None
+        self._memory = None
+        self._capacity = 0
+        self._tree_words = 0  # Room for the flattened tree after the rows, in 8-byte words
+
+    def __call__(self, x, y, mass):
+        n = len(x)
+        if n < self.min_bodies or self.workers < 2:
+            return self.solver(x, y, mass, np.arange(n))
+        tree = tree_arrays = None
+        words = 0
+        if hasattr(self.solver, "build"):
+            layout, tree_arrays = self.solver.flatten(self.solver.build(x, y, mass))
+            tree = layout, [(array.dtype.str, len(array)) for array in tree_arrays]
+            words = sum(_words(array.nbytes) for array in tree_arrays)
+        if n > self._capacity or words > self._tree_words:
+            self._allocate(max(n, 2 * self._capacity) if n > self._capacity else self._capacity,
+                           max(words, 2 * self._tree_words) if words > self._tree_words else self._tree_words)
+        if self._pool is None:
+            self._pool = multiprocessing.get_context(_START_METHOD).Pool(self.workers)
+
+        arrays = _views(self._memory.buf, self._capacity, n)
+        arrays["x"][:] = x
+        arrays["y"][:] = y
+        arrays["mass"][:] = mass
+        if tree is not None:
+            for view, array in zip(_tree_views(self._memory.buf, self._capacity, tree[1]), tree_arrays):
+                view[:] = array
+        bounds = np.linspace(0, n, self.workers * self.chunks_per_worker + 1).astype(int)
+        self._pool.starmap(_evaluate, [
+            (self._memory.name, self._capacity, n, start, stop, self.solver, tree)
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ])
+        return arrays["ax"].copy(), arrays["ay"].copy()
+
+    def _allocate(self, capacity, tree_words):
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+        self._memory = shared_memory.SharedMemory(create=True, size=(len(_FIELDS) * capacity + tree_words) * 8)
+        self._capacity = capacity
+        self._tree_words = tree_words
+
+    def close(self):
+        """Stops the worker processes and frees the shared block."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+            self._capacity = 0
+            self._tree_words = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
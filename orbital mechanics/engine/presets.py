@@ -0,0 +1,62 @@
+"""Initial conditions of the simulator presets, free of any display code.
+
+Each preset is a list of (x, y, vx, vy, mass, radius, color) tuples in the
+order of the CelestialBody constructor: SI units, with radius in pixels.
+"""
+
+import numpy as np
+
+from engine.body_system import BodySystem
+
+_SUN = (0, 0, 0, 0, 1.989e30, 30, (255, 255, 0))
+_PLANETS = [
+    (5.791e10, 0, 0, 47_870, 3.301e23, 5, (169, 169, 169)),  # Mercury
+    (1.082e11, 0, 0, 35_020, 4.867e24, 12, (255, 215, 0)),  # Venus
+    (1.496e11, 0, 0, 29_800, 5.972e24, 10, (0, 0, 255)),  # Earth
+    (1.496e11 + 3.844e8, 0, 0, 29_800 + 1_022, 7.348e22, 2, (169, 169, 169)),  # Moon
+    (2.279e11, 0, 0, 24_077, 6.417e23, 8, (255, 0, 0)),  # Mars
+]
+_MARTIAN_MOONS = [
+    (2.279e11 + 6e6, 0, 0, 24_077 + 2138, 1.08e16, 1, (169, 169, 169)),  # Phobos
+    (2.279e11 + 2.346e7, 0, 0, 24_077 + 1351.3, 1.51e15, 1, (0, 0, 255)),  # Deimos
+]
+
+PRESETS = {
+    "preset_1": [
+        (0, 0, 0, 0, 1.989e30, 30, (255, 255, 0)),
+        (1.0e11, 0, 0, 25_000, 1.989e30, 30, (255, 165, 0)),
+        (-1.0e11, 0, 0, -25_000, 1.989e30, 30, (255, 255, 255)),
+    ],
+    "preset_2": [
+        (1.0e10, 0, 0, 0, 1.989e30, 30, (255, 255, 0)),
+        (1.9e11, 0, 0, 25_000, 3e30, 30, (255, 165, 0)),
+        (-1.0e11, 0, 0, -25_000, 2.989e30, 30, (255, 255, 255)),
+    ],
+    "preset_3": [
+        (0, 0, 0, 0, 5.0e30, 35, (255, 255, 0)),  # Large central body
+        (1.2e11, 0, 0, 25_000, 3.0e30, 30, (255, 165, 0)),
+        (-1.0e11, 0, 0, -35_000, 1.5e30, 25, (135, 206, 250)),
+    ],
+    "binary": [
+        (-5.0e10, 0, 0, 15_000, 2.0e30, 25, (255, 215, 0)),  # Binary pair
+        (5.0e10, 0, 0, -15_000, 2.0e30, 25, (255, 165, 0)),
+        (0, -3.0e11, 8_000, 0, 1.9e30, 20, (135, 206, 250)),  # Circumbinary star
+    ],
+    # The whole.py solar system, and the one of solar_system.py with the moons of Mars
+    "solar_system": [_SUN] + _PLANETS,
+    "solar_system_moons": [_SUN] + _PLANETS + _MARTIAN_MOONS,
+}
+
+
+def preset_arrays(name):
+    """Returns float arrays (x, y, vx, vy, mass) of a preset."""
+    columns = np.array([body[:5] for body in PRESETS[name]], float).T
+    return tuple(column.copy() for column in columns)
+
+
+def preset_system(name, trail_length=200):
+    """Returns a new BodySystem holding a preset."""
+    system = BodySystem(max(8, len(PRESETS[name])), trail_length)
+    for body in PRESETS[name]:
+        system.add(*body)
+    return system
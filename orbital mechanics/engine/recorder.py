@@ -0,0 +1,133 @@
+"""Trajectory recording to a memory-mapped file, and scrubbable playback.
+
+File layout (little-endian):
+    header   magic, version, body count, frame capacity, frames written
+    bodies   (N, 5) float64: mass, radius, red, green, blue
+    frames   (capacity, 1 + 2N) float64: sim time, x[N], y[N]
+
+The file is preallocated at its full size when recording starts and
+frames are written straight into the mapping, so recording costs one
+row copy per frame. Playback maps the same file read-only and touches
+only the rows it displays, so any point of a long run is reached
+without recomputing or loading the rest.
+"""
+
+import bisect
+
+import numpy as np
+
+from engine.body_system import BodySystem
+
+MAGIC = b"ORBTRAJ"  # Null-padded to 8 bytes in the header
+VERSION = 1
+
+_HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("bodies", "<u4"),
+                    ("capacity", "<u8"), ("count", "<u8"), ("reserved", "<u8", 4)])
+
+
+def _frames_offset(n):
+    return _HEADER.itemsize + n * 5 * 8
+
+
+class TrajectoryRecorder:
+    """Streams (time, x, y) frames of a BodySystem into a preallocated file."""
+
+    def __init__(self, path, system, max_frames=100_000):
+        n = len(system)
+        self.path = path
+        self.capacity = max_frames
+        with open(path, "wb") as f:
+            f.truncate(_frames_offset(n) + max_frames * (1 + 2 * n) * 8)
+        self.header = np.memmap(path, _HEADER, "r+", shape=())
+        self.header["magic"] = MAGIC
+        self.header["version"] = VERSION
+        self.header["bodies"] = n
+        self.header["capacity"] = max_frames
+        static = np.memmap(path, "<f8", "r+", _HEADER.itemsize, (n, 5))
+        static[:, 0] = system.mass
+        static[:, 1] = system.radius
+        static[:, 2:] = system.color
+        static.flush()
+        self.frames = np.memmap(path, "<f8", "r+", _frames_offset(n), (max_frames, 1 + 2 * n))
+        self.n = n
+        self.count = 0
+
+    def record(self, sim_time, x, y):
+        """Appends one frame; returns False (and records nothing) once the file is full.
+
+        Frames must come in time order, since playback seeks by bisecting
+        the time column; an earlier sim_time than the last frame's raises
+        ValueError.
+        """
+        if self.count and sim_time < self.frames[self.count - 1, 0]:
+            raise ValueError(f"frame at {sim_time} s is earlier than the last recorded one")
+        if self.count == self.capacity:
+            return False
+        row = self.frames[self.count]
+        row[0] = sim_time
+        row[1:1 + self.n] = x
+        row[1 + self.n:] = y
+        self.count += 1
+        self.header["count"] = self.count
+        return True
+
+    def close(self):
+        self.frames.flush()
+        self.header.flush()
+        del self.frames, self.header
+
+
+class TrajectoryPlayer:
+    """Read-only view of a recording with a playback clock.
+
+    time runs at speed simulated seconds per wall-clock second while not
+    paused (negative speeds play backwards), and positions() interpolates
+    linearly between the two frames around it.
+    """
+
+    def __init__(self, path):
+        header = np.memmap(path, _HEADER, "r", shape=())
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} trajectory recording")
+        self.n = int(header["bodies"])
+        self.count = int(header["count"])
+        if self.count == 0:
+            raise ValueError(f"{path} holds no frames")
+        self.static = np.array(np.memmap(path, "<f8", "r", _HEADER.itemsize, (self.n, 5)))
+        frames = np.memmap(path, "<f8", "r", _frames_offset(self.n), (int(header["capacity"]), 1 + 2 * self.n))
+        self.frames = frames[:self.count]
+        self.times = self.frames[:, 0]
+        self.start = float(self.times[0])
+        self.end = float(self.times[-1])
+        self.time = self.start
+        self.speed = 1.0
+        self.paused = False
+
+    def bodies(self, trail_length=200):
+        """A BodySystem with the recorded masses, radii and colours, at the current time."""
+        system = BodySystem(max(8, self.n), trail_length)
+        x, y = self.positions()
+        for i, (mass, radius, *color) in enumerate(self.static):
+            system.add(x[i], y[i], 0.0, 0.0, mass, radius, tuple(int(c) for c in color))
+        return system
+
+    def advance(self, wall_seconds):
+        """Moves the playback clock; it stops at either end of the recording."""
+        if not self.paused:
+            self.seek(self.time + self.speed * wall_seconds)
+
+    def seek(self, sim_time):
+        self.time = min(max(sim_time, self.start), self.end)
+
+    def positions(self):
+        """Returns (x, y) at the playback time, from at most two frames."""
+        # bisect reads ~log2(count) times from the mapping; searchsorted would copy the column
+        i = bisect.bisect_right(self.times, self.time)
+        if i >= self.count:
+            row = self.frames[-1]
+            return row[1:1 + self.n].copy(), row[1 + self.n:].copy()
+        before, after = self.frames[max(i - 1, 0)], self.frames[i]
+        span = after[0] - before[0]
+        w = (self.time - before[0]) / span if span > 0 else 0.0
+        row = before[1:] + w * (after[1:] - before[1:])
+        return row[:self.n], row[self.n:]
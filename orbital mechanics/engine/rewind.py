@@ -0,0 +1,127 @@
+"""Rewind through recent history from a bounded ring of keyframes.
+
+Storing every step is too expensive, so the ring keeps a keyframe (the
+positions and velocities of all bodies) every `interval` steps and
+rebuilds any state in between by re-simulating from the keyframe before
+it. The memory cap (and max_keyframes) fixes how many keyframes fit;
+spreading them over history_steps steps sets the interval, and with it
+the worst-case rewind cost: a larger cap means denser keyframes and less
+re-simulation.
+
+A settings change (dt, integrator, solver) must start a new segment with
+mark(), which resets the integrator. The periodic keyframes within a
+segment leave the live integrator alone and keep a copy of its
+history() instead (IAS15's step size, the Wisdom-Holman hierarchy),
+which re-simulation restores, so it reproduces the live run exactly.
+This copy is not counted in max_bytes.
+Segments record the integrator as an immutable setting (its name, plus
+the wrapper's parameters when regularized), since the live objects change
+(the regularization wrapper is re-pointed at a new base integrator), and
+re-simulation builds it again from that.
+"""
+
+import bisect
+import math
+
+import numpy as np
+
+from engine.integrators import INTEGRATORS, run_system
+from engine.regularization import EncounterRegularization
+
+
+def _setting(integrator):
+    """An immutable description of an integrator, for _integrator() to rebuild it."""
+    if isinstance(integrator, EncounterRegularization):
+        return ("regularized", _setting(integrator.base), integrator.threshold, integrator.steps_per_orbit)
+    # Integrators outside the registry are kept as they are
+    return integrator.name if INTEGRATORS.get(integrator.name) is integrator else integrator
+
+
+def _integrator(setting):
+    if isinstance(setting, tuple):
+        _, base, threshold, steps_per_orbit = setting
+        return EncounterRegularization(_integrator(base), threshold, steps_per_orbit)
+    return INTEGRATORS[setting] if isinstance(setting, str) else setting
+
+
+class KeyframeRing:
+    """Keyframes of one BodySystem, oldest overwritten first."""
+
+    def __init__(self, max_bytes=32 * 2**20, history_steps=100_000, max_keyframes=4096):
+        self.max_bytes = max_bytes
+        self.history_steps = history_steps
+        self.max_keyframes = max_keyframes
+        self.reset(0)
+
+    def reset(self, n):
+        """Forgets all keyframes and sizes the ring for n bodies."""
+        frame_bytes = (4 * n + 1) * 8
+        self.capacity = max(2, min(self.max_bytes // frame_bytes, self.max_keyframes, self.history_steps))
+        self.interval = max(1, math.ceil(self.history_steps / self.capacity))
+        self._times = np.zeros(self.capacity)
+        self._states = np.zeros((self.capacity, 4, n))
+        self._segments = [None] * self.capacity  # (dt, integrator setting, solver) after each keyframe
+        self._histories = [None] * self.capacity  # Integrator history at each keyframe, None when reset
+        self._integrator = None  # The live integrator of the current segment
+        self._head = 0  # Slot of the oldest keyframe
+        self.count = 0
+        self._steps = 0  # Live steps since the last keyframe
+
+    @property
+    def earliest(self):
+        """Sim time of the oldest keyframe, or None when there is none."""
+        return float(self._times[self._head]) if self.count else None
+
+    def _slot(self, k):
+        return (self._head + k) % self.capacity
+
+    def mark(self, system, sim_time, dt, integrator, solver):
+        """Starts a segment: resets the integrator and takes a keyframe with these settings."""
+        integrator.reset()
+        self._keep(system, sim_time, (dt, _setting(integrator), solver), None)
+        self._integrator = integrator
+
+    def _keep(self, system, sim_time, segment, history):
+        if self.count == self.capacity:
+            self._head = self._slot(1)
+            self.count -= 1
+        slot = self._slot(self.count)
+        self._times[slot] = sim_time
+        for row, field in zip(self._states[slot], ("x", "y", "vx", "vy")):
+            row[:] = getattr(system, field)
+        self._segments[slot] = segment
+        self._histories[slot] = history
+        self.count += 1
+        self._steps = 0
+
+    def advanced(self, system):
+        """Call after every live step; takes the periodic keyframes."""
+        self._steps += 1
+        if self._steps >= self.interval:
+            slot = self._slot(self.count - 1)
+            segment = self._segments[slot]
+            self._keep(system, self._times[slot] + self._steps * segment[0], segment, self._integrator.history())
+
+    def rewind(self, system, sim_time):
+        """Rebuilds the state at sim_time in place; returns the time actually reached.
+
+        Times before the oldest keyframe clamp to it. Keyframes after the
+        restored state are dropped, since the run continues from there.
+        """
+        if not self.count:
+            return None
+        k = bisect.bisect_right(range(self.count), sim_time, key=lambda k: self._times[self._slot(k)])
+        slot = self._slot(max(k - 1, 0))
+        start = float(self._times[slot])
+        dt, setting, solver = self._segments[slot]
+        integrator = _integrator(setting)
+        for row, field in zip(self._states[slot], ("x", "y", "vx", "vy")):
+            getattr(system, field)[:] = row
+        steps = max(0, round((sim_time - start) / dt))
+        integrator.reset()
+        if self._histories[slot] is not None:
+            integrator.restore(self._histories[slot])
+        run_system(system, dt, steps, integrator, solver)
+        self.count = max(k - 1, 0) + 1
+        self._steps = steps
+        return start + steps * dt
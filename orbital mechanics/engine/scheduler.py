@@ -0,0 +1,53 @@
+"""Fixed-timestep scheduling of physics substeps against wall-clock frames."""
+
+import time
+
+
+class SubstepScheduler:
+    """Decouples simulated time from rendered frames.
+
+    Each frame, simulated time owed is accumulated at `warp` simulated
+    seconds per wall-clock second and paid off in fixed-dt substeps, as
+    many as fit in `budget` seconds of CPU. Time that cannot be paid off
+    within the budget is dropped rather than carried over, so a heavy
+    scene slows down instead of spiralling. warp=None runs flat out.
+    """
+
+    def __init__(self, budget=0.010, warp=None, max_frame_time=0.25):
+        self.budget = budget
+        self.warp = warp
+        self.max_frame_time = max_frame_time
+        self.sim_time = 0.0
+        self.substeps = 0  # Substeps run in the last frame
+        self.achieved_warp = 0.0  # Smoothed simulated seconds per wall second
+        self._owed = 0.0
+        self._last = None
+
+    def hold(self):
+        """Call on frames without physics (paused) so the gap is not owed."""
+        self._last = None
+        self._owed = 0.0
+        self.substeps = 0
+
+    def run(self, step, dt):
+        """Calls step(dt) zero or more times for this frame; returns the count."""
+        now = time.perf_counter()
+        wall = 1 / 60 if self._last is None else min(now - self._last, self.max_frame_time)
+        self._last = now
+        if self.warp is not None:
+            self._owed += self.warp * wall
+
+        deadline = now + self.budget
+        steps = 0
+        while (self.warp is None or self._owed >= dt) and time.perf_counter() < deadline:
+            step(dt)
+            steps += 1
+            self._owed -= dt
+        if self.warp is None or self._owed > dt:
+            self._owed = 0.0
+
+        self.substeps = steps
+        self.sim_time += steps * dt
+        if wall > 0:
+            self.achieved_warp += 0.1 * (steps * dt / wall - self.achieved_warp)
+        return steps
@@ -0,0 +1,292 @@
+"""Physics in a worker process, published to the renderer via shared memory.
+
+The worker owns the bodies, tracers, integrator and solver, and runs the
+substep scheduler in ticks of its own. After each tick it writes
+positions and statistics into one of two snapshot slots of a
+SharedMemory block and marks that slot as the latest. The renderer only
+ever copies the latest complete slot, so neither side waits on the
+other. Each slot carries a sequence number that is odd while it is being
+written (a seqlock); a reader that sees it change during a copy retries.
+Settings changes go to the worker as (command, *args) tuples on a queue;
+("jump", seconds) fast-forwards without waiting for the wall clock, and
+("rewind", sim_time) goes back to a recent state through the worker's
+keyframe ring.
+"""
+
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine.body_system import BodySystem
+from engine.integrators import INTEGRATORS, advance_by, advance_system
+from engine.regularization import EncounterRegularization
+from engine.rewind import KeyframeRing
+from engine.scheduler import SubstepScheduler
+from engine.tracers import TracerParticles
+
+# Statistics at the head of each snapshot slot, after which come the arrays
+STATS = ("seq", "generation", "bodies", "tracers", "sim_time", "substeps", "achieved_warp",
+         "accepted", "rejected", "regularized", "regularization_failures", "jumps", "jump_progress", "rewinds",
+         "history")
+
+TICK = 1 / 240  # Seconds of wall time per worker tick, and the publish interval
+
+# Forked, as in engine.parallel, so the worker does not re-run the pygame script
+_START_METHOD = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+
+
+class SharedSnapshot:
+    """Two snapshot slots for up to `capacity` bodies and `tracer_capacity` tracers."""
+
+    def __init__(self, capacity, tracer_capacity, name=None):
+        self.capacity = capacity
+        self.tracer_capacity = tracer_capacity
+        self.slot_size = len(STATS) + 4 * capacity + 2 * tracer_capacity
+        size = (1 + 2 * self.slot_size) * 8
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.block = np.ndarray(1 + 2 * self.slot_size, float, self.memory.buf)
+        if name is None:
+            self.block[:] = 0.0
+        self.slots = [self._slot(k) for k in range(2)]
+
+    def _slot(self, k):
+        start = 1 + k * self.slot_size
+        stats = self.block[start:start + len(STATS)]
+        start += len(STATS)
+        arrays = {}
+        for field, length in (("x", self.capacity), ("y", self.capacity), ("vx", self.capacity),
+                              ("vy", self.capacity), ("tx", self.tracer_capacity),
+                              ("ty", self.tracer_capacity)):
+            arrays[field] = self.block[start:start + length]
+            start += length
+        return stats, arrays
+
+    def publish(self, stats, system, tracers):
+        """Writes a snapshot into the slot that is not the latest, then flips to it."""
+        k = 1 - int(self.block[0])
+        slot_stats, arrays = self.slots[k]
+        seq = slot_stats[0] + 1  # Odd: being written
+        slot_stats[0] = seq
+        n = len(system)
+        m = min(len(tracers), self.tracer_capacity)
+        for field in ("x", "y", "vx", "vy"):
+            arrays[field][:n] = getattr(system, field)
+        arrays["tx"][:m] = tracers.x[:m]
+        arrays["ty"][:m] = tracers.y[:m]
+        stats = dict(stats, bodies=n, tracers=m)
+        slot_stats[1:] = [stats[name] for name in STATS[1:]]
+        slot_stats[0] = seq + 1
+        self.block[0] = k
+
+    def read(self, attempts=8):
+        """Copies the latest complete snapshot: (stats dict, arrays dict), or None."""
+        for _ in range(attempts):
+            slot_stats, arrays = self.slots[int(self.block[0])]
+            seq = slot_stats[0]
+            if seq % 2:
+                continue
+            stats = dict(zip(STATS, slot_stats.tolist()))
+            n = int(stats["bodies"])
+            m = int(stats["tracers"])
+            copies = {field: arrays[field][:n].copy() for field in ("x", "y", "vx", "vy")}
+            copies["tx"] = arrays["tx"][:m].copy()
+            copies["ty"] = arrays["ty"][:m].copy()
+            if slot_stats[0] == seq:
+                return stats, copies
+        return None
+
+    def close(self, unlink=False):
+        del self.block, self.slots  # Release the exported buffer
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _physics_loop(name, capacity, tracer_capacity, commands, solvers, integrator_name, rewind_bytes, rewind_steps):
+    """Worker process: applies commands, steps the scheduler and publishes."""
+    snapshot = SharedSnapshot(capacity, tracer_capacity, name)
+    system = BodySystem(trail_length=1)  # The renderer keeps its own trails
+    tracers = TracerParticles()
+    integrator = INTEGRATORS[integrator_name]
+    encounters = EncounterRegularization(integrator)
+    regularize = False
+    solver = solvers[0]
+    dt = 86400
+    paused = True
+    generation = 0
+    jumps = 0  # Jumps completed, so the renderer can tell when one is over
+    rewinds = 0  # Likewise for rewinds
+    scheduler = SubstepScheduler(budget=0.9 * TICK, warp=dt * 60)
+    keyframes = KeyframeRing(rewind_bytes, rewind_steps)
+
+    def publish(jump_progress=0.0):
+        snapshot.publish({
+            "generation": generation,
+            "sim_time": scheduler.sim_time,
+            "substeps": scheduler.substeps,
+            "achieved_warp": scheduler.achieved_warp,
+            "accepted": getattr(integrator, "accepted", 0),
+            "rejected": getattr(integrator, "rejected", 0),
+            "regularized": encounters.regularized_steps,
+            "regularization_failures": encounters.failed_steps,
+            "jumps": jumps,
+            "jump_progress": jump_progress,
+            "rewinds": rewinds,
+            "history": keyframes.earliest if keyframes.count else scheduler.sim_time,
+        }, system, tracers)
+
+    def keyframe():
+        # Starts a new rewind segment with the current settings
+        if len(system):
+            keyframes.mark(system, scheduler.sim_time, dt, encounters if regularize else integrator, solver)
+
+    def step(step_dt):
+        stepper = encounters if regularize else integrator
+        if len(tracers):
+            before = (system.x.copy(), system.y.copy(), system.mass.copy())
+            advance_system(system, step_dt, stepper, solver)
+            tracers.advance(step_dt, before, (system.x, system.y, system.mass))
+        else:
+            advance_system(system, step_dt, stepper, solver)
+        keyframes.advanced(system)
+
+    while True:
+        tick_start = time.perf_counter()
+        try:
+            # Sleep on the queue while paused instead of spinning
+            while True:
+                command, *args = commands.get(timeout=TICK) if paused else commands.get_nowait()
+                if command == "quit":
+                    for pool_solver in solvers:
+                        if hasattr(pool_solver, "close"):
+                            pool_solver.close()
+                    snapshot.close()
+                    return
+                elif command == "load":
+                    generation, x, y, vx, vy, mass, sim_time = args
+                    system = BodySystem(max(8, len(x)), trail_length=1)
+                    for body in zip(x, y, vx, vy, mass):
+                        system.add(*body, 0, (0, 0, 0))
+                    integrator.reset()
+                    tracers.clear()
+                    scheduler.hold()
+                    scheduler.sim_time = sim_time
+                    keyframes.reset(len(system))
+                    keyframe()
+                elif command == "paused":
+                    paused = args[0]
+                    scheduler.hold()
+                elif command == "dt":
+                    dt = args[0]
+                    keyframe()
+                elif command == "warp":
+                    scheduler.warp = args[0]
+                elif command == "integrator":
+                    integrator = INTEGRATORS[args[0]]
+                    integrator.reset()
+                    encounters.base = integrator
+                    keyframe()
+                elif command == "regularize":
+                    regularize = args[0]
+                    keyframe()
+                elif command == "solver":
+                    solver = solvers[args[0]]
+                    keyframe()
+                elif command == "ring":
+                    tracers.add_ring(*args)
+                elif command == "clear_tracers":
+                    tracers.clear()
+                elif command == "jump":
+                    # Fast-forward by args[0] seconds in large batches, publishing progress
+                    duration = args[0]
+                    start = scheduler.sim_time
+
+                    def progress(done):
+                        scheduler.sim_time = start + done
+                        publish(done / duration)
+
+                    advance_by(system, duration, dt, encounters if regularize else integrator,
+                               solver, tracers, progress)
+                    scheduler.hold()
+                    keyframe()
+                    jumps += 1
+                elif command == "rewind":
+                    # Re-simulate from the nearest keyframe; tracers are not kept in keyframes
+                    reached = keyframes.rewind(system, args[0])
+                    if reached is not None:
+                        scheduler.sim_time = reached
+                        tracers.clear()
+                        keyframe()
+                    scheduler.hold()
+                    rewinds += 1
+        except queue.Empty:
+            pass
+
+        if not paused:
+            scheduler.run(step, dt)
+        publish()
+        if not paused:
+            time.sleep(max(0.0, TICK - (time.perf_counter() - tick_start)))
+
+
+class SimulationProcess:
+    """Handle on the physics worker, used from the render loop.
+
+    solvers is the list of gravity solvers the worker may select by
+    index. send() queues a command; read() returns the latest snapshot
+    of the current generation (the last load()), or None if the state
+    has not changed since the previous read(). rewind_bytes caps the
+    memory of the worker's KeyframeRing, spread over rewind_steps steps.
+    """
+
+    def __init__(self, solvers, integrator="euler", capacity=1024, tracer_capacity=20_000,
+                 rewind_bytes=32 * 2**20, rewind_steps=100_000):
+        self.snapshot = SharedSnapshot(capacity, tracer_capacity)
+        self.commands = multiprocessing.get_context(_START_METHOD).Queue()
+        self.generation = 0
+        self._last_key = None
+        # Not a daemon: the worker may start its own pool (engine.parallel)
+        self.process = multiprocessing.get_context(_START_METHOD).Process(
+            target=_physics_loop,
+            args=(self.snapshot.memory.name, capacity, tracer_capacity, self.commands, solvers, integrator,
+                  rewind_bytes, rewind_steps),
+        )
+        self.process.start()
+
+    def send(self, command, *args):
+        self.commands.put((command, *args))
+
+    def load(self, system, sim_time=0.0):
+        """Replaces the worker's bodies with a copy of a BodySystem's state at sim_time."""
+        if len(system) > self.snapshot.capacity:
+            raise ValueError(f"at most {self.snapshot.capacity} bodies fit in the snapshot buffer")
+        self.generation += 1
+        self.send("load", self.generation, *(getattr(system, field).copy()
+                                             for field in ("x", "y", "vx", "vy", "mass")), sim_time)
+
+    def read(self):
+        result = self.snapshot.read()
+        if result is None:
+            return None
+        stats, arrays = result
+        # Paused ticks republish the same state; skip those
+        key = (stats["generation"], stats["sim_time"], stats["tracers"], stats["rewinds"],
+               stats["jumps"], stats["jump_progress"])
+        if stats["generation"] != self.generation or key == self._last_key:
+            return None
+        self._last_key = key
+        return stats, arrays
+
+    def stop(self):
+        """Asks the worker to quit, waits for it and frees the shared block."""
+        self.send("quit")
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.snapshot.close(unlink=True)
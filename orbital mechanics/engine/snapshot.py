@@ -0,0 +1,77 @@
+"""Versioned binary snapshots of a whole simulation state.
+
+Layout (little-endian):
+    header   magic, version, body count, dt, sim time, integrator name
+    bodies   N records of x, y, vx, vy, mass, radius (float64) and r, g, b (uint8)
+
+The body records are one structured array, so a snapshot is written
+with a single tobytes() and read back with a single frombuffer(), even
+for 10^5 bodies.
+"""
+
+import numpy as np
+
+from engine.body_system import BodySystem
+
+MAGIC = b"ORBSNAP"  # Null-padded to 8 bytes in the header
+VERSION = 1
+
+_HEADER = np.dtype([("magic", "S8"), ("version", "<u4"), ("bodies", "<u4"), ("dt", "<f8"),
+                    ("sim_time", "<f8"), ("integrator", "S32")])
+_BODY = np.dtype([("x", "<f8"), ("y", "<f8"), ("vx", "<f8"), ("vy", "<f8"), ("mass", "<f8"),
+                  ("radius", "<f8"), ("color", "u1", 3)])
+
+
+def encode_snapshot(system, dt, sim_time=0.0, integrator=""):
+    """Returns the snapshot of a BodySystem and the run settings as bytes."""
+    header = np.zeros((), _HEADER)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["bodies"] = len(system)
+    header["dt"] = dt
+    header["sim_time"] = sim_time
+    header["integrator"] = integrator.encode()
+    bodies = np.empty(len(system), _BODY)
+    for field in ("x", "y", "vx", "vy", "mass", "radius", "color"):
+        bodies[field] = getattr(system, field)
+    return header.tobytes() + bodies.tobytes()
+
+
+def decode_snapshot(data, system=None, trail_length=200):
+    """Restores a snapshot; returns (system, settings).
+
+    The bodies are written into `system` in place when it has the same
+    number of bodies (so views of them, such as a locked camera body,
+    stay valid) and its trails are cleared; otherwise a new BodySystem
+    is built. settings is a dict with dt, sim_time and integrator.
+    """
+    header = np.frombuffer(data, _HEADER, 1)[0]
+    if header["magic"] != MAGIC or header["version"] != VERSION:
+        raise ValueError(f"not a version {VERSION} simulation snapshot")
+    bodies = np.frombuffer(data, _BODY, int(header["bodies"]), _HEADER.itemsize)
+    fields = [bodies[field] for field in ("x", "y", "vx", "vy", "mass", "radius", "color")]
+    if system is not None and len(system) == len(bodies):
+        for name, values in zip(("x", "y", "vx", "vy", "mass", "radius", "color"), fields):
+            getattr(system, name)[:] = values
+        system.ax[:] = 0.0
+        system.ay[:] = 0.0
+        system.clear_trails()
+    else:
+        system = BodySystem.from_arrays(*fields, trail_length=trail_length)
+    settings = {
+        "dt": float(header["dt"]),
+        "sim_time": float(header["sim_time"]),
+        "integrator": header["integrator"].decode(),
+    }
+    return system, settings
+
+
+def save_snapshot(path, system, dt, sim_time=0.0, integrator=""):
+    with open(path, "wb") as f:
+        f.write(encode_snapshot(system, dt, sim_time, integrator))
+
+
+def load_snapshot(path, system=None, trail_length=200):
+    """Reads a snapshot file in one read; see decode_snapshot."""
+    with open(path, "rb") as f:
+        return decode_snapshot(f.read(), system, trail_length)
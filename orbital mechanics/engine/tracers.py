@@ -0,0 +1,70 @@
+"""Massless test particles for rings, belts and debris.
+
+Tracers feel the gravity of the massive bodies but do not source it, so
+a step costs O(N * M) for N tracers and M massive bodies instead of
+O((N + M)^2). They are stored as four flat arrays and advanced together
+with a kick-drift-kick leapfrog.
+"""
+
+import numpy as np
+
+from engine.gravity import G, field_accelerations
+
+
+class TracerParticles:
+    """A population of massless particles stored as flat arrays."""
+
+    def __init__(self, x=(), y=(), vx=(), vy=()):
+        self.x = np.array(x, float)
+        self.y = np.array(y, float)
+        self.vx = np.array(vx, float)
+        self.vy = np.array(vy, float)
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, x, y, vx, vy):
+        """Appends particles given as arrays."""
+        self.x = np.concatenate([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        self.vx = np.concatenate([self.vx, vx])
+        self.vy = np.concatenate([self.vy, vy])
+
+    def clear(self):
+        self.__init__()
+
+    def kick(self, h, sources, softening=0.0):
+        """v += a * h, with a from the massive bodies sources = (x, y, mass)."""
+        if len(self.x):
+            ax, ay = field_accelerations(self.x, self.y, *sources, softening)
+            self.vx += ax * h
+            self.vy += ay * h
+
+    def drift(self, h):
+        self.x += self.vx * h
+        self.y += self.vy * h
+
+    def advance(self, dt, before, after, softening=0.0):
+        """One leapfrog step while the massive bodies move from before to after.
+
+        before and after are (x, y, mass) arrays of the massive bodies at
+        the start and end of the step.
+        """
+        self.kick(dt / 2, before, softening)
+        self.drift(dt)
+        self.kick(dt / 2, after, softening)
+
+    def add_ring(self, centre, central_mass, r_inner, r_outer, count, seed=None):
+        """Adds particles on circular orbits in an annulus.
+
+        centre is (x, y, vx, vy) of the point they orbit, typically a star
+        or a binary's centre of mass with its total mass as central_mass.
+        """
+        rng = np.random.default_rng(seed)
+        # Uniform in area between the two radii
+        r = np.sqrt(rng.uniform(r_inner ** 2, r_outer ** 2, count))
+        angle = rng.uniform(0, 2 * np.pi, count)
+        speed = np.sqrt(G * central_mass / r)
+        cx, cy, cvx, cvy = centre
+        self.add(cx + r * np.cos(angle), cy + r * np.sin(angle),
+                 cvx - speed * np.sin(angle), cvy + speed * np.cos(angle))
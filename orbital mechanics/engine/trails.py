@@ -0,0 +1,111 @@
+"""Trails of all bodies in one preallocated ring buffer.
+
+Every body has a ring of `length` points in one (capacity, length, 2)
+array, so recording is a handful of array operations per frame however
+many bodies there are, and drawing can project every trail to the screen
+in a single vectorized operation.
+
+Points can be decimated by path curvature: the newest point of a trail
+is a tip that follows the body, and it only becomes a kept point once
+the path has turned by more than an angle tolerance, over a segment at
+least `spacing` long. A straight stretch then costs one point however
+long it is, a tight turn gets a point every few degrees, and the number
+of steps taken no longer matters, so the fixed length is a budget of
+visual detail rather than of steps.
+"""
+
+import math
+
+import numpy as np
+
+# Default decimation: a point is kept where the path turns by ANGLE radians,
+# at most one per SPACING pixels, so detail follows the screen, not the step count
+SPACING = 2
+ANGLE = math.radians(2)
+
+
+class TrailBuffer:
+    """The last `length` kept positions of up to `capacity` bodies.
+
+    points[i] is the ring of body i's trail, last written at column
+    heads[i] - 1; counts[i] is how many of its newest points are valid,
+    so a body that joined or was cleared later has a shorter trail.
+    spacing (in pixels) and angle (in radians) set the decimation.
+    """
+
+    def __init__(self, capacity=8, length=200, spacing=SPACING, angle=ANGLE):
+        self.length = length
+        self.spacing = spacing
+        self.angle = angle
+        self.points = np.zeros((capacity, length, 2))
+        self.counts = np.zeros(capacity, np.int64)
+        self.heads = np.zeros(capacity, np.int64)  # Column after each body's tip
+
+    def append(self, x, y, scale=None):
+        """Records the current positions of the first len(x) bodies.
+
+        Without a scale every position is kept. With one (pixels per unit
+        of x and y), a body's tip is moved to its new position, and is
+        kept (with a new tip after it) only if the path turns there by at
+        least `angle` radians and the segment it ends is at least
+        `spacing` pixels long on screen.
+        """
+        spacing, angle = (self.spacing / scale, self.angle) if scale else (0.0, 0.0)
+        n = len(x)
+        rows = np.arange(n)
+        heads = self.heads[:n]
+        counts = self.counts[:n]
+        position = np.column_stack((x, y))
+        keep = counts < 2
+        if spacing > 0 or angle > 0:
+            tip = self.points[rows, (heads - 1) % self.length]
+            segment = tip - self.points[rows, (heads - 2) % self.length]
+            step = position - tip
+            cross = segment[:, 0] * step[:, 1] - segment[:, 1] * step[:, 0]
+            dot = (segment * step).sum(axis=1)
+            turned = np.arctan2(np.abs(cross), dot) >= angle
+            keep |= turned & (np.hypot(segment[:, 0], segment[:, 1]) >= spacing) & step.any(axis=1)
+        else:
+            keep[:] = True
+        # Kept tips stay; the new position starts the next tip. Other tips move.
+        np.add(heads, keep, out=heads)
+        heads %= self.length
+        np.minimum(counts + keep, self.length, out=counts)
+        self.points[rows, (heads - 1) % self.length] = position
+
+    def clear(self, slot=None):
+        """Empties one body's trail, or every trail."""
+        if slot is None:
+            self.counts[:] = 0
+        else:
+            self.counts[slot] = 0
+
+    def move(self, source, target):
+        """Moves a trail to another slot, as BodySystem.remove() moves bodies."""
+        self.points[target] = self.points[source]
+        self.counts[target] = self.counts[source]
+        self.heads[target] = self.heads[source]
+        self.counts[source] = 0
+
+    def resize(self, capacity):
+        points = np.zeros((capacity, self.length, 2))
+        counts = np.zeros(capacity, np.int64)
+        heads = np.zeros(capacity, np.int64)
+        kept = min(capacity, len(self.counts))
+        points[:kept] = self.points[:kept]
+        counts[:kept] = self.counts[:kept]
+        heads[:kept] = self.heads[:kept]
+        self.points, self.counts, self.heads = points, counts, heads
+
+    def ordered(self, n):
+        """The trails of the first n bodies as an (n, length, 2) array, oldest point first.
+
+        Only the last counts[i] points of row i are valid.
+        """
+        columns = (self.heads[:n, None] + np.arange(self.length)) % self.length
+        return np.take_along_axis(self.points[:n], columns[:, :, None], axis=1)
+
+    def trail(self, slot):
+        """One body's valid trail points, oldest first, as a (count, 2) array."""
+        count = self.counts[slot]
+        return self.points[slot, (self.heads[slot] + np.arange(self.length - count, self.length)) % self.length]
@@ -0,0 +1,138 @@
+"""Wisdom-Holman mixed-variable symplectic integrator.
+
+Each body orbits a parent: the most massive body for planets, and the
+planet whose Hill sphere it sits in for moons. The dominant parent-body
+Kepler motion is solved analytically (engine.kepler) and only the
+remaining interaction, i.e. everything except the parent's pull, is
+integrated numerically as a kick. A step is drift(dt/2) kick(dt)
+drift(dt/2), so steps can be a sizeable fraction of the shortest orbit
+instead of a tiny fraction of it.
+"""
+
+import numpy as np
+
+from engine.gravity import G
+from engine.kepler import kepler_drift
+
+
+def find_parents(x, y, mass):
+    """Returns the parent index of every body (-1 for the root).
+
+    A body is a moon of the lightest heavier body whose Hill sphere,
+    taken around the root, contains it; otherwise it orbits the root.
+    """
+    n = len(x)
+    root = int(np.argmax(mass))
+    dist_root = np.hypot(x - x[root], y - y[root])
+    hill = dist_root * np.cbrt(mass / (3 * mass[root]))
+    parents = np.full(n, root)
+    parents[root] = -1
+    for i in range(n):
+        if i == root:
+            continue
+        best = None
+        for j in range(n):
+            if j in (i, root) or mass[j] <= mass[i]:
+                continue
+            if np.hypot(x[i] - x[j], y[i] - y[j]) < hill[j] and (best is None or mass[j] < mass[best]):
+                best = j
+        if best is not None:
+            parents[i] = best
+    return parents
+
+
+class WisdomHolman:
+    """Hierarchical Wisdom-Holman integrator with the INTEGRATORS interface.
+
+    The hierarchy is found on the first step and kept until reset(), or
+    can be given explicitly as a list of parent indices (-1 for the root).
+    """
+
+    name = "wisdom-holman"
+    max_dt = 86400
+
+    def __init__(self, parents=None):
+        self.parents = parents
+        self._auto = parents is None
+        self._levels = None
+
+    def reset(self):
+        """Re-detects the hierarchy on the next step (new scene)."""
+        if self._auto:
+            self.parents = None
+        self._levels = None
+
+    def history(self):
+        """A copy of the hierarchy in use, or None before the first step."""
+        return None if self.parents is None else np.array(self.parents)
+
+    def restore(self, history):
+        self.parents = None if history is None else np.array(history)
+        self._levels = None
+
+    def _hierarchy(self, x, y, mass):
+        if self.parents is None or len(self.parents) != len(x):
+            self.parents = find_parents(x, y, mass)
+            self._levels = None
+        if self._levels is None:
+            parents = np.asarray(self.parents)
+            depth = np.zeros(len(parents), int)
+            for i in range(len(parents)):
+                j = parents[i]
+                while j >= 0:
+                    depth[i] += 1
+                    j = parents[j]
+            self._levels = [np.flatnonzero(depth == d) for d in range(1, depth.max() + 1)]
+        return np.asarray(self.parents), self._levels
+
+    def step(self, x, y, vx, vy, mass, dt, accel):
+        """Advances the state arrays by dt in place."""
+        parents, levels = self._hierarchy(x, y, mass)
+        self._drift(x, y, vx, vy, mass, parents, levels, dt / 2)
+        self._kick(x, y, vx, vy, mass, parents, levels, dt, accel)
+        self._drift(x, y, vx, vy, mass, parents, levels, dt / 2)
+
+    def _drift(self, x, y, vx, vy, mass, parents, levels, h):
+        children = np.flatnonzero(parents >= 0)
+        p = parents[children]
+        rx, ry = x[children] - x[p], y[children] - y[p]
+        ux, uy = vx[children] - vx[p], vy[children] - vy[p]
+        mu = G * (mass[p] + mass[children])
+        rx, ry, ux, uy = kepler_drift(rx, ry, ux, uy, mu, h)
+
+        # The root coasts; everything else is rebuilt from its parent outwards
+        root = parents < 0
+        x[root] += vx[root] * h
+        y[root] += vy[root] * h
+        slot = np.empty(len(parents), int)
+        slot[children] = np.arange(len(children))
+        for level in levels:
+            k = slot[level]
+            p = parents[level]
+            x[level] = x[p] + rx[k]
+            y[level] = y[p] + ry[k]
+            vx[level] = vx[p] + ux[k]
+            vy[level] = vy[p] + uy[k]
+
+    def _kick(self, x, y, vx, vy, mass, parents, levels, h, accel):
+        ax, ay = accel(x, y, mass)
+        children = np.flatnonzero(parents >= 0)
+        p = parents[children]
+        rx, ry = x[children] - x[p], y[children] - y[p]
+        mu = G * (mass[p] + mass[children])
+        inv_r3 = np.hypot(rx, ry) ** -3
+        # Relative acceleration minus the parent's Kepler pull, already in the drift
+        dax = ax[children] - ax[p] + mu * rx * inv_r3
+        day = ay[children] - ay[p] + mu * ry * inv_r3
+        ux = vx[children] - vx[p] + dax * h
+        uy = vy[children] - vy[p] + day * h
+
+        root = parents < 0
+        vx[root] += ax[root] * h
+        vy[root] += ay[root] * h
+        slot = np.empty(len(parents), int)
+        slot[children] = np.arange(len(children))
+        for level in levels:
+            k = slot[level]
+            vx[level] = vx[parents[level]] + ux[k]
+            vy[level] = vy[parents[level]] + uy[k]
@@ -0,0 +1,173 @@
+"""Batched drawing helpers for the game screen."""
+
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+import pygame.gfxdraw
+
+
+def draw_tracers(screen, tracers, color, scale, offset_x, offset_y):
+    """Plots every tracer particle as one pixel with a single array write."""
+    if not len(tracers):
+        return
+    width, height = screen.get_size()
+    px = (tracers.x * scale + offset_x).astype(np.int64)
+    py = (tracers.y * scale + offset_y).astype(np.int64)
+    visible = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    pixels = pygame.surfarray.pixels2d(screen)
+    pixels[px[visible], py[visible]] = screen.map_rgb(color)
+    del pixels  # Unlocks the surface
+
+
+# Colour stops of the density heatmap, from one particle in a pixel to the densest pixel
+DENSITY_STOPS = [(110, 30, 190), (220, 20, 110), (255, 130, 0), (255, 255, 220)]
+_DENSITY_COLORS = np.stack([np.interp(np.linspace(0, len(DENSITY_STOPS) - 1, 256), np.arange(len(DENSITY_STOPS)),
+                                      channel) for channel in zip(*DENSITY_STOPS)], axis=-1).astype(np.uint8)
+
+
+def draw_density(screen, x, y, scale, offset_x, offset_y):
+    """Replaces the screen with a histogram of positions, one bin per pixel.
+
+    Counts are coloured on a log scale relative to the densest pixel, so
+    a single particle stays visible next to a core of millions; empty
+    pixels are black. Colours are looked up per distinct count in the
+    screen's own pixel format and written with one surfarray blit.
+    """
+    width, height = screen.get_size()
+    px = x * scale
+    px += offset_x
+    np.floor(px, out=px)
+    py = y * scale
+    py += offset_y
+    np.floor(py, out=py)
+    visible = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    # surfarray indexes (x, y), so pixel (px, py) is bin px * height + py
+    counts = np.bincount((px[visible] * height + py[visible]).astype(np.int64), minlength=width * height)
+    densest = counts.max()
+    colors = np.zeros(densest + 1, np.int32)  # Colour of each count, 0 staying black
+    if densest:
+        level = np.log(np.arange(1, densest + 1)) / max(np.log(densest), 1.0)
+        colors[1:] = pygame.surfarray.map_array(screen, _DENSITY_COLORS[None])[0][(level * 255).astype(np.int64)]
+    pygame.surfarray.blit_array(screen, colors[counts].reshape(width, height))
+
+
+class SpriteCache:
+    """Pre-rendered anti-aliased discs keyed by (color, pixel radius).
+
+    Zooming changes every radius, so the sprites of the old zoom level
+    stop being used; once more than max_sprites exist, the least
+    recently used are evicted first. Only small discs are cached: above
+    about 6 px, blending a sprite's anti-aliased edge costs more than
+    SDL's plain fill, so larger discs are drawn directly.
+    """
+
+    def __init__(self, max_sprites=512, max_radius=6):
+        self.max_sprites = max_sprites
+        self.max_radius = max_radius  # Larger discs are drawn directly instead
+        self._sprites = OrderedDict()
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def get(self, color, radius):
+        key = (color, radius)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1), pygame.SRCALPHA)
+            pygame.gfxdraw.filled_circle(sprite, radius, radius, radius, color)
+            pygame.gfxdraw.aacircle(sprite, radius, radius, radius, color)
+            if pygame.display.get_surface():
+                sprite = sprite.convert_alpha()  # Blits faster in the display's pixel format
+            sprite.set_alpha(255, pygame.RLEACCEL)  # Run-length encoded: skips the clear corners
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        else:
+            self._sprites.move_to_end(key)
+        return sprite
+
+
+def draw_bodies(screen, projection, colors, sprites):
+    """Draws the visible discs of an engine.camera Projection, one per occupied pixel.
+
+    Discs up to sprites.max_radius come from the SpriteCache and are all
+    submitted in one Surface.blits call; each distinct (color, radius)
+    is looked up once per frame. Larger discs are filled with
+    pygame.draw.circle.
+    """
+    indices, px, py, radius = projection.discs()
+    rgb = colors[indices].astype(np.int64)
+    small = radius <= sprites.max_radius
+    keys = (radius[small] << 24) | (rgb[small, 0] << 16) | (rgb[small, 1] << 8) | rgb[small, 2]
+    kinds, which = np.unique(keys, return_inverse=True)
+    kind_sprites = [sprites.get(((key >> 16) & 255, (key >> 8) & 255, key & 255), key >> 24)
+                    for key in kinds.tolist()]
+    corners = zip((px[small] - radius[small]).tolist(), (py[small] - radius[small]).tolist())
+    screen.blits([(kind_sprites[k], corner) for k, corner in zip(which.tolist(), corners)], doreturn=False)
+    large = ~small
+    for color, x, y, r in zip(rgb[large].tolist(), px[large].tolist(), py[large].tolist(), radius[large].tolist()):
+        pygame.draw.circle(screen, color, (x, y), r)
+
+
+# Trails fade from opaque (newest) to faint (oldest) in this many steps
+TRAIL_BANDS = 4
+
+# Screen coordinates are clipped to this range before drawing, so a far zoom
+# cannot overflow the integer coordinates pygame draws with
+_COORDINATE_LIMIT = 1 << 20
+
+_trail_layers = {}  # Screen size -> cached per-pixel alpha surface for trails
+
+
+def draw_trails(screen, trails, colors, scale, offset_x, offset_y, width=2, bands=TRAIL_BANDS):
+    """Draws the trails of a TrailBuffer, faded with age.
+
+    All trails are projected to the screen in one array operation. Each
+    body's trail is split into `bands` age bands, each drawn as a single
+    polyline with its band's alpha onto a cached transparent layer, which
+    is then blended onto the screen in one blit.
+    """
+    n = len(colors)
+    counts = trails.counts[:n]
+    if not n or counts.max() < 2:
+        return
+    points = trails.ordered(n) * scale + (offset_x, offset_y)
+    points = np.clip(points, -_COORDINATE_LIMIT, _COORDINATE_LIMIT).astype(np.int64)
+
+    size = screen.get_size()
+    if size not in _trail_layers:
+        _trail_layers[size] = pygame.Surface(size, pygame.SRCALPHA)
+    layer = _trail_layers[size]
+    layer.fill((0, 0, 0, 0))
+
+    length = trails.length
+    alphas = [255 * (band + 1) // bands for band in range(bands)]
+    for row, count, (red, green, blue) in zip(points, counts.tolist(), np.asarray(colors).tolist()):
+        first = length - count
+        for band in range(bands):
+            # Bands split each trail's own points; each starts at the previous band's last point
+            start = max(first + count * band // bands - 1, first)
+            stop = first + count * (band + 1) // bands
+            if stop - start >= 2:
+                pygame.draw.lines(layer, (red, green, blue, alphas[band]), False, row[start:stop].tolist(), width)
+    screen.blit(layer, (0, 0))
+
+
+# Colour stops of the stability map, from regular (MEGNO 2) to strongly chaotic
+MAP_STOPS = [(0, 0, 80), (0, 120, 255), (255, 255, 0), (255, 60, 0)]
+
+
+def save_stability_map(path, megno, escaped, low=2.0, high=8.0, cell=8):
+    """Writes a MEGNO grid to an image file, one cell x cell square per entry.
+
+    Row 0 of the grid is drawn at the bottom. Members in which a body
+    escaped are drawn gray.
+    """
+    level = np.clip((megno - low) / (high - low), 0.0, 1.0) * (len(MAP_STOPS) - 1)
+    stops = np.arange(len(MAP_STOPS))
+    rgb = np.stack([np.interp(level, stops, channel) for channel in zip(*MAP_STOPS)], axis=-1)
+    rgb[escaped] = (90, 90, 90)
+    rgb = np.repeat(np.repeat(rgb[::-1], cell, axis=0), cell, axis=1)
+    # surfarray indexes (x, y), the grid (row, column)
+    pygame.image.save(pygame.surfarray.make_surface(rgb.swapaxes(0, 1).astype(np.uint8)), path)
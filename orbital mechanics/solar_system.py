@@ -1,7 +1,12 @@
 import pygame
 import sys
 import math
-from collections import deque
+
+from engine.gravity import apply_gravity, direct_accelerations
+from engine.integrators import advance_bodies
+from engine.trails import TrailBuffer
+from engine.wisdom_holman import WisdomHolman
+from render import draw_trails
 
 # Constants
 WHITE = (255, 255, 255)
@@ -24,10 +29,15 @@ clock = pygame.time.Clock()
 scale = 1e-6  # Scale for rendering (1 pixel = 1 billion meters)
 visual_scale = 1  # Visual scale multiplier for radius
 dt = 1500  # Initial time step in seconds
+EULER_MAX_DT = 360  # Largest time step the plain Euler update stays stable with
+# Wisdom-Holman solves the Kepler orbits of planets and moons analytically,
+# so it tolerates steps of hours to a day. Toggle with W.
+wisdom_holman = WisdomHolman()
+use_wisdom_holman = True
 zoom_factor_visual = 1.1  # Zoom multiplier for visual appearance (radius)
 zoom_factor_distance = 1.25  # Zoom multiplier for distance (positions)
 
-# Initial trail settings
+# Trail settings, for the trails of all bodies in one shared buffer
 MAX_TRAIL_LENGTH = 500  # Max number of trail positions to store
 
 class CelestialBody:
@@ -41,17 +51,8 @@ class CelestialBody:
         self.mass = mass
         self.radius = radius  # Radius in pixels
         self.color = color
-        self.trail = deque(maxlen=MAX_TRAIL_LENGTH)  # Store past positions for trail
 
     def draw(self, screen, scale, visual_scale, offset_x, offset_y, trails_enabled):
-        # Draw the trail if enabled
-        if trails_enabled:
-            for i, pos in enumerate(self.trail):
-                # Fade the trail with increasing age (lighter color for older positions)
-                alpha = max(0, 255 - (i * (255 // MAX_TRAIL_LENGTH)))
-                trail_color = (self.color[0], self.color[1], self.color[2], alpha)
-                pygame.draw.circle(screen, trail_color, (int(pos[0] * scale + offset_x), int(pos[1] * scale + offset_y)), 2)
-        
         # Adjust the radius based on the visual scale only
         scaled_radius = max(2, int(self.radius * visual_scale))  # Apply only visual scale to radius
         scaled_x = int(self.x * scale + offset_x)
@@ -63,7 +64,6 @@ class CelestialBody:
         self.vy += self.ay * dt
         self.x += self.vx * dt
         self.y += self.vy * dt
-        self.trail.append((self.x, self.y))  # Store the current position for the trail
 
     def update_acceleration(self, fx, fy):
         self.ax = fx / self.mass
@@ -75,18 +75,6 @@ class CelestialBody:
         distance = math.sqrt((mouse_x - scaled_x) ** 2 + (mouse_y - scaled_y) ** 2)
         return distance <= max(5, int(self.radius * visual_scale))  # Adjust click radius based on zoom
 
-def calculate_force(body1, body2):
-    dx = body2.x - body1.x
-    dy = body2.y - body1.y
-    distance = math.sqrt(dx**2 + dy**2)
-    if distance == 0:
-        return 0, 0  # Avoid division by zero
-    force = G * body1.mass * body2.mass / distance**2
-    angle = math.atan2(dy, dx)
-    fx = force * math.cos(angle)
-    fy = force * math.sin(angle)
-    return fx, fy
-
 bodies = [
     # Main simulation setup
     CelestialBody(0, 0, 0, 0, 1.989e30, 30, YELLOW),  # Sun, 30 pixels radius
@@ -122,6 +110,7 @@ font = pygame.font.SysFont("Arial", 50)
 simulation_speed = 1
 running = True
 trails_enabled = False  # Trails are off by default
+trails = TrailBuffer(len(bodies), MAX_TRAIL_LENGTH)
 
 
 while running:
@@ -147,13 +136,17 @@ while running:
             # Toggle trails visibility
             if event.key == pygame.K_t:
                 trails_enabled = not trails_enabled
-            # Speed up time step with D, slow down with S, adjust trail length
-            if event.key == pygame.K_s and dt <= 360:  # Speed up the timestep
+            # Switch between Wisdom-Holman and the plain Euler update
+            if event.key == pygame.K_w:
+                use_wisdom_holman = not use_wisdom_holman
+                if not use_wisdom_holman:
+                    dt = min(dt, EULER_MAX_DT)
+            # Speed up time step with D, slow down with S
+            max_dt = wisdom_holman.max_dt if use_wisdom_holman else EULER_MAX_DT
+            if event.key == pygame.K_s and dt <= max_dt:  # Speed up the timestep
                 dt *= 1.1  # Increase the timestep
-                MAX_TRAIL_LENGTH = max(1, int(MAX_TRAIL_LENGTH * 1.1))  # Increase the trail length proportionally
             elif event.key == pygame.K_d and dt >= 60:  # Slow down the timestep
                 dt /= 1.1  # Decrease the timestep
-                MAX_TRAIL_LENGTH = max(1, int(MAX_TRAIL_LENGTH / 1.1))  # Decrease the trail length proportionally
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:  # Left mouse button
                 mouse_x, mouse_y = pygame.mouse.get_pos()
@@ -169,17 +162,17 @@ while running:
         body.ay = 0
 
     if not paused:
-        # Calculate forces and update accelerations
-        for i, body1 in enumerate(bodies):
-            for j, body2 in enumerate(bodies):
-                if i != j:  # Don't calculate the force for a body against itself
-                    fx, fy = calculate_force(body1, body2)
-                    body1.ax += fx / body1.mass
-                    body1.ay += fy / body1.mass
-
-        # Update positions
-        for body in bodies:
-            body.update_position(dt)
+        if use_wisdom_holman:
+            advance_bodies(bodies, dt, wisdom_holman, direct_accelerations)
+        else:
+            # Calculate accelerations for all bodies in one vectorized pass
+            apply_gravity(bodies)
+
+            # Update positions
+            for body in bodies:
+                body.update_position(dt)
+
+        trails.append([body.x for body in bodies], [body.y for body in bodies], scale)
 
     # Adjust offset if a body is locked
     if locked_body:
@@ -188,6 +181,8 @@ while running:
 
     # Drawing
     WIN.fill(BLACK)
+    if trails_enabled:
+        draw_trails(WIN, trails, [body.color for body in bodies], scale, offset_x, offset_y)
     for body in bodies:
         body.draw(WIN, scale, visual_scale, offset_x, offset_y, trails_enabled)
 
@@ -1,7 +1,10 @@
 import pygame
 import sys
 import math
-from collections import deque
+
+from engine.gravity import apply_gravity
+from engine.trails import TrailBuffer
+from render import draw_trails
 import random
 
 random_preset = random.randint(1, 4)
@@ -33,7 +36,7 @@ dt = 86400  # Initial time step in seconds
 zoom_factor_visual = 1.1  # Zoom multiplier for visual appearance (radius)
 zoom_factor_distance = 1.25  # Zoom multiplier for distance (positions)
 
-# Initial trail settings
+# Trail settings, for the trails of all bodies in one shared buffer
 MAX_TRAIL_LENGTH = 100  # Max number of trail positions to store
 
 class CelestialBody:
@@ -47,17 +50,8 @@ class CelestialBody:
         self.mass = mass
         self.radius = radius  # Radius in pixels
         self.color = color
-        self.trail = deque(maxlen=MAX_TRAIL_LENGTH)  # Store past positions for trail
 
     def draw(self, screen, scale, visual_scale, offset_x, offset_y, trails_enabled):
-        # Draw the trail if enabled
-        if trails_enabled:
-            for i, pos in enumerate(self.trail):
-                # Fade the trail with increasing age (lighter color for older positions)
-                alpha = max(0, 255 - (i * (255 // MAX_TRAIL_LENGTH)))
-                trail_color = (self.color[0], self.color[1], self.color[2], alpha)
-                pygame.draw.circle(screen, trail_color, (int(pos[0] * scale + offset_x), int(pos[1] * scale + offset_y)), 2)
-        
         # Adjust the radius based on the visual scale only
         scaled_radius = max(2, int(self.radius * visual_scale))  # Apply only visual scale to radius
         scaled_x = int(self.x * scale + offset_x)
@@ -69,7 +63,6 @@ class CelestialBody:
         self.vy += self.ay * dt
         self.x += self.vx * dt
         self.y += self.vy * dt
-        self.trail.append((self.x, self.y))  # Store the current position for the trail
 
     def update_acceleration(self, fx, fy):
         self.ax = fx / self.mass
@@ -81,24 +74,11 @@ class CelestialBody:
         distance = math.sqrt((mouse_x - scaled_x) ** 2 + (mouse_y - scaled_y) ** 2)
         return distance <= max(5, int(self.radius * visual_scale))  # Adjust click radius based on zoom
 
-def calculate_force(body1, body2):
-    dx = body2.x - body1.x
-    dy = body2.y - body1.y
-    distance = math.sqrt(dx**2 + dy**2)
-    if distance == 0:
-        return 0, 0  # Avoid division by zero
-    force = G * body1.mass * body2.mass / distance**2
-    angle = math.atan2(dy, dx)
-    fx = force * math.cos(angle)
-    fy = force * math.sin(angle)
-    return fx, fy
-
 def reset_simulation(bodies, initial_conditions):
     for i, body in enumerate(bodies):
         body.x, body.y, body.vx, body.vy = initial_conditions[i]
         body.ax = 0
         body.ay = 0
-        body.trail.clear()  # Clear the trail
 
 
 preset_1 =  [# Main simulation setup
@@ -157,30 +137,8 @@ elif random_preset == 4:
 
 
 
-# Store initial conditions for resetting
-initial_conditions_1 = [
-    (0, 0, 0, 0),  # Sun 1
-    (1.0e11, 0, 0, 25_000),  # Sun 2
-    (-1.0e11, 0, 0, -25_000),  # Sun 3
-]
-
-initial_conditions_2 = [
-    (1.0e10, 0, 0, 0),  # Sun 1
-    (1.9e11, 0, 0, 25_000),  # Sun 2
-    (-3.0e11, 0, 0, -25_000),  # Sun 3
-]
-
-initial_conditions_3 = [
-    (0, 0, 0, 0),  # Central body
-    (1.2e11, 0, 0, 25_000),  # Medium-sized body
-    (-1.0e11, 0, 0, -35_000),  # Smaller body
-]
-
-initial_conditions_binary_system = [
-    (-5.0e10, 0, 0, 15_000),  # Yellow star 
-    (5.0e10, 0, 0, -15_000),  # Orange star
-    (0, -3.0e11, 8_000, 0),  # Light blue star
-]
+# Copy the starting state for resetting, so it cannot drift out of sync with the presets
+initial_conditions = [(body.x, body.y, body.vx, body.vy) for body in bodies]
 
 
 # Center the system on the screen
@@ -194,6 +152,7 @@ font = pygame.font.SysFont("Arial", 50)
 simulation_speed = 1
 running = True
 trails_enabled = False  # Trails are off by default
+trails = TrailBuffer(len(bodies), MAX_TRAIL_LENGTH)
 
 while running:
     for event in pygame.event.get():
@@ -218,23 +177,15 @@ while running:
             # Toggle trails visibility
             if event.key == pygame.K_t:
                 trails_enabled = not trails_enabled
-            # Speed up time step with D, slow down with S, adjust trail length
+            # Speed up time step with D, slow down with S
             if event.key == pygame.K_s and dt <= 86400:  # Speed up the timestep
                 dt *= 1.1  # Increase the timestep
-                MAX_TRAIL_LENGTH = max(1, int(MAX_TRAIL_LENGTH * 1.1))  # Increase the trail length proportionally
             elif event.key == pygame.K_d and dt >= 600:  # Slow down the timestep
                 dt /= 1.1  # Decrease the timestep
-                MAX_TRAIL_LENGTH = max(1, int(MAX_TRAIL_LENGTH / 1.1))  # Decrease the trail length proportionally
             # Reset simulation when 'R' is pressed
             elif event.key == pygame.K_r:
-                if random_preset == 1:
-                    reset_simulation(bodies, initial_conditions_1)
-                elif random_preset == 2:
-                    reset_simulation(bodies, initial_conditions_2)
-                elif random_preset == 3:
-                    reset_simulation(bodies, initial_conditions_3)
-                elif random_preset == 4:
-                    reset_simulation(bodies, initial_conditions_binary_system)
+                reset_simulation(bodies, initial_conditions)
+                trails.clear()
         elif event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:  # Left mouse button
                 mouse_x, mouse_y = pygame.mouse.get_pos()
@@ -250,18 +201,15 @@ while running:
         body.ay = 0
 
     if not paused:
-        # Calculate forces and update accelerations
-        for i, body1 in enumerate(bodies):
-            for j, body2 in enumerate(bodies):
-                if i != j:  # Don't calculate the force for a body against itself
-                    fx, fy = calculate_force(body1, body2)
-                    body1.ax += fx / body1.mass
-                    body1.ay += fy / body1.mass
+        # Calculate accelerations for all bodies in one vectorized pass
+        apply_gravity(bodies)
 
         # Update positions
         for body in bodies:
             body.update_position(dt)
 
+        trails.append([body.x for body in bodies], [body.y for body in bodies], scale)
+
     # Adjust offset if a body is locked
     if locked_body:
         offset_x = WIDTH // 2 - int(locked_body.x * scale)
@@ -269,6 +217,8 @@ while running:
 
     # Drawing
     WIN.fill(BLACK)
+    if trails_enabled:
+        draw_trails(WIN, trails, [body.color for body in bodies], scale, offset_x, offset_y)
     for body in bodies:
         body.draw(WIN, scale, visual_scale, offset_x, offset_y, trails_enabled)
 
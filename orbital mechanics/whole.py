@@ -1,8 +1,25 @@
 import pygame
 import sys
+import os
 import math
-from collections import deque
 import random
+import time
+
+import numpy as np
+
+from engine.barnes_hut import BarnesHut
+from engine.body_system import BodySystem
+from engine.camera import Projection
+from engine.gravity import direct_accelerations
+from engine.integrators import INTEGRATORS
+from engine.parallel import ParallelSolver
+from engine.particle_mesh import ParticleMesh
+from engine.presets import preset_system
+from engine.recorder import TrajectoryPlayer, TrajectoryRecorder
+from engine.sim_process import STATS, SimulationProcess
+from engine.snapshot import decode_snapshot, encode_snapshot, save_snapshot
+from engine.tracers import TracerParticles
+from render import SpriteCache, draw_bodies, draw_density, draw_tracers, draw_trails
 
 random_preset = random.randint(1, 4)
 print(random_preset)
@@ -29,6 +46,7 @@ pygame.display.set_caption("Orbital Simulator")
 # Fonts
 font = pygame.font.Font(None, 74)
 button_font = pygame.font.Font(None, 50)
+hud_font = pygame.font.Font(None, 24)
 
 # Button dimensions
 BUTTON_WIDTH = 200
@@ -43,6 +61,47 @@ background_image = pygame.transform.scale(background_image, (SCREEN_WIDTH, SCREE
 G = 6.67430e-11  # Gravitational constant in m^3 kg^-1 s^-2
 visual_scale = 1
 
+# Gravity solvers cycled with the G key
+GRAVITY_SOLVERS = [
+    ("direct", direct_accelerations),
+    ("barnes-hut", BarnesHut(theta=0.5)),
+    ("particle-mesh", ParticleMesh(grid_size=256, softening=1.0)),
+    # Target chunks on every core; serial below ParallelSolver.min_bodies
+    ("parallel direct", ParallelSolver()),
+    ("parallel barnes-hut", ParallelSolver(BarnesHut(theta=0.5))),
+]
+
+# Integrator used when a preset starts; the I key cycles through INTEGRATORS
+INTEGRATOR = "euler"
+
+# Massless ring/belt particles toggled with the A key
+TRACER_COUNT = 20_000
+TRACER_COLOR = (120, 120, 120)
+
+# Simulated time skipped by the J key, in seconds
+JUMP_TIME = 10 * 365.25 * 86400
+# A jump is abandoned if the worker publishes no progress for this many seconds
+JUMP_STALL_TIMEOUT = 30
+SECONDS_PER_YEAR = 365.25 * 86400
+
+# Trajectory recording toggled with C and played back with V
+RECORDING_PATH = "recording.orbrec"
+MAX_RECORDED_FRAMES = 200_000  # One frame per rendered physics snapshot
+PLAYBACK_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_SPACE, pygame.K_p)
+
+# Pre-rendered body discs, reused across frames until zooming retires them
+body_sprites = SpriteCache()
+
+# Whole-state snapshot saved with F5 and loaded with F9
+SNAPSHOT_PATH = "scene.orbsnap"
+
+# Holding Backspace rewinds at REWIND_SPEED times the target warp. The worker keeps
+# keyframes of the last REWIND_STEPS steps (about 14 minutes at the starting warp)
+# in at most REWIND_MEMORY bytes; more memory means less re-simulation per rewind.
+REWIND_SPEED = 4
+REWIND_STEPS = 50_000
+REWIND_MEMORY = 64 * 2**20
+
 
 # Draw the back arrow
 def draw_back_arrow():
@@ -168,7 +227,12 @@ def draw_tutorial_screen():
         ("P", "Pause / Unpause"),
         ("T", "Toggle trails of bodies"),
         ("Arrow Keys", "Navigate camera"),
-        ("R", "Reset simulation")
+        ("R", "Reset simulation"),
+        ("J", "Jump 10 years ahead"),
+        ("C / V", "Record / replay trajectory"),
+        ("F5 / F9", "Save / load snapshot"),
+        ("Backspace", "Rewind (hold)"),
+        ("H", "Density heatmap view")
     ]
 
     small_font = pygame.font.Font(None, 24)  # Smaller font size (24)
@@ -226,156 +290,33 @@ def handle_tutorial_click(pos):
 
 
 
-class CelestialBody:
-    def __init__(self, x, y, vx, vy, mass, radius, color):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.ax = 0
-        self.ay = 0
-        self.mass = mass
-        self.radius = radius
-        self.color = color
-        self.trail = deque(maxlen=200)
-
-    def draw(self, screen, scale, visual_scale, offset_x, offset_y, trails_enabled):
-        if trails_enabled and len(self.trail) > 1:
-            for i in range(1, len(self.trail)):
-                pos1 = self.trail[i - 1]
-                pos2 = self.trail[i]
-                alpha = max(0, 255 - (i * (255 // len(self.trail))))
-                trail_color = (self.color[0], self.color[1], self.color[2], alpha)
-                # Draw a line between consecutive positions in the trail
-                pygame.draw.line(screen, trail_color,
-                             (int(pos1[0] * scale + offset_x), int(pos1[1] * scale + offset_y)),
-                             (int(pos2[0] * scale + offset_x), int(pos2[1] * scale + offset_y)), 2)
-
-        scaled_radius = max(2, int(self.radius * visual_scale))
-        scaled_x = int(self.x * scale + offset_x)
-        scaled_y = int(self.y * scale + offset_y)
-        pygame.draw.circle(screen, self.color, (scaled_x, scaled_y), scaled_radius)
-
-
-
-
-    def update_position(self, dt):
-        self.vx += self.ax * dt
-        self.vy += self.ay * dt
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.trail.append((self.x, self.y))
-
-    def update_acceleration(self, fx, fy):
-        self.ax = fx / self.mass
-        self.ay = fy / self.mass
-
-    def is_clicked(self, mouse_x, mouse_y, scale, offset_x, offset_y):
-        scaled_x = int(self.x * scale + offset_x)
-        scaled_y = int(self.y * scale + offset_y)
-        distance = math.sqrt((mouse_x - scaled_x) ** 2 + (mouse_y - scaled_y) ** 2)
-        return distance <= max(5, int(self.radius * visual_scale))
-
-def calculate_force(body1, body2):
-    dx = body2.x - body1.x
-    dy = body2.y - body1.y
-    distance = math.sqrt(dx**2 + dy**2)
-    if distance == 0:
-        return 0, 0
-    force = G * body1.mass * body2.mass / distance**2
-    angle = math.atan2(dy, dx)
-    fx = force * math.cos(angle)
-    fy = force * math.sin(angle)
-    return fx, fy
-
-def reset_simulation(bodies, initial_conditions):
-    for i, body in enumerate(bodies):
-        body.x, body.y, body.vx, body.vy = initial_conditions[i]
-        body.ax = 0
-        body.ay = 0
-        body.trail.clear()
-
-preset_1 = [
-    CelestialBody(0, 0, 0, 0, 1.989e30, 30, YELLOW),
-    CelestialBody(1.0e11, 0, 0, 25_000, 1.989e30, 30, (255, 165, 0)),
-    CelestialBody(-1.0e11, 0, 0, -25_000, 1.989e30, 30, (255, 255, 255))
-]
-
-preset_2 = [
-    CelestialBody(1.0e10, 0, 0, 0, 1.989e30, 30, YELLOW),
-    CelestialBody(1.9e11, 0, 0, 25_000, 3e30, 30, (255, 165, 0)),
-    CelestialBody(-1.0e11, 0, 0, -25_000, 2.989e30, 30, (255, 255, 255))
-]
-
-preset_3 = [
-    # Body 1: Large central body
-    CelestialBody(0, 0, 0, 0, 5.0e30, 35, YELLOW),  # Central body with significant mass
-
-    # Body 2: Medium-sized body
-    CelestialBody(1.2e11, 0, 0, 25_000, 3.0e30, 30, (255, 165, 0)),  # Orange body, orbiting central body
-
-    # Body 3: Smaller body
-    CelestialBody(-1.0e11, 0, 0, -35_000, 1.5e30, 25, (135, 206, 250)),  # Light blue body with higher velocity
-]
-
-preset_binary_system = [
-    # Star 1: Binary pair
-    CelestialBody(-5.0e10, 0, 0, 15_000, 2.0e30, 25, (255, 215, 0)),  # Yellow star
-
-    # Star 2: Binary pair
-    CelestialBody(5.0e10, 0, 0, -15_000, 2.0e30, 25, (255, 165, 0)),  # Orange star
-
-    # Star 3: Orbiting the binary system
-    CelestialBody(0, -3.0e11, 8_000, 0, 1.9e30, 20, (135, 206, 250)),  # Light blue star
-]
-
-
-
-initial_conditions_1 = [
-    (0, 0, 0, 0),
-    (1.0e11, 0, 0, 25_000),
-    (-1.0e11, 0, 0, -25_000)
-]
-
-initial_conditions_2 = [
-    (1.0e10, 0, 0, 0),
-    (1.9e11, 0, 0, 25_000),
-    (-1.0e11, 0, 0, -25_000)
-]
+def reset_simulation(bodies, snapshot):
+    """Restores bodies in place from an encoded snapshot; returns its settings."""
+    return decode_snapshot(snapshot, bodies)[1]
 
-initial_conditions_3 = [
-    (0, 0, 0, 0),  # Central body
-    (1.2e11, 0, 0, 25_000),  # Medium-sized body
-    (-1.0e11, 0, 0, -35_000),  # Smaller body
-]
-
-initial_conditions_binary_system = [
-    (-5.0e10, 0, 0, 15_000),  # Yellow star 
-    (5.0e10, 0, 0, -15_000),  # Orange star
-    (0, -3.0e11, 8_000, 0),  # Light blue star
-]
 
+def stop_recording(recorder):
+    """Closes a C recording if one is running; returns None, the recorder's new value.
 
-bodies_solar_system = [
-    # Main simulation setup
-    CelestialBody(0, 0, 0, 0, 1.989e30, 30, YELLOW),  # Sun, 30 pixels radius
+    Called before anything that sends the simulation time backwards, since
+    a recording's frames must stay in time order for playback to seek.
+    """
+    if recorder:
+        print(f"Recorded {recorder.count} frames to {RECORDING_PATH}")
+        recorder.close()
+    return None
 
-    # Mercury: closest to the Sun (no moons)
-    CelestialBody(5.791e10, 0, 0, 47_870, 3.301e23, 5, (169, 169, 169)),  # Grayish color
+preset_1 = preset_system("preset_1")
+preset_2 = preset_system("preset_2")
+preset_3 = preset_system("preset_3")
+preset_binary_system = preset_system("binary")
+bodies_solar_system = preset_system("solar_system")
 
-    # Venus: second planet from the Sun (no moons)
-    CelestialBody(1.082e11, 0, 0, 35_020, 4.867e24, 12, (255, 215, 0)),  # Yellowish color
-
-    # Earth: third planet from the Sun
-    CelestialBody(1.496e11, 0, 0, 29_800, 5.972e24, 10, (0, 0, 255)),  # Blue color
-    # Earth's moons
-    CelestialBody(1.496e11 + 3.844e8, 0, 0, 29_800 + 1_022, 7.348e22, 2, GRAY),  # Moon
-
-    # Mars: fourth planet from the Sun
-    CelestialBody(2.279e11, 0, 0, 24_077, 6.417e23, 8, (255, 0, 0)),  # Red color
-
-
-]
+# Starting state of every preset, restored by the R key
+PRESET_SNAPSHOTS = {
+    system: encode_snapshot(system, 86400, 0.0, INTEGRATOR)
+    for system in (preset_1, preset_2, preset_3, preset_binary_system, bodies_solar_system)
+}
 
 
 
@@ -387,11 +328,87 @@ elif random_preset == 2:
 elif random_preset == 3:
     bodies = preset_3
 
-def draw_game_screen(bodies, scale, visual_scale, offset_x, offset_y, trails_enabled, paused):
+def draw_jump_progress(fraction, target_years):
+    """Draws only a progress bar while the simulation fast-forwards."""
     screen.fill(BLACK)
+    bar = pygame.Rect(SCREEN_WIDTH // 4, SCREEN_HEIGHT // 2 - 10, SCREEN_WIDTH // 2, 20)
+    pygame.draw.rect(screen, GRAY, bar, 2)
+    pygame.draw.rect(screen, WHITE, (bar.x, bar.y, int(bar.width * fraction), bar.height))
+    text = hud_font.render(f"Jumping to year {target_years:,.1f}... {fraction:.0%}", True, WHITE)
+    screen.blit(text, (SCREEN_WIDTH // 2 - text.get_width() // 2, bar.y - 30))
+    pygame.display.flip()
+
 
-    for body in bodies:
-        body.draw(screen, scale, visual_scale, offset_x, offset_y, trails_enabled)
+def jump_to_epoch(physics, bodies, stats, duration):
+    """Fast-forwards the physics process by duration seconds.
+
+    Input is not handled and the scene is not drawn until the jump is
+    over; only a progress bar is shown, a few times per second. Returns
+    the stats of the first snapshot after the jump, or the old stats if
+    the worker died or stopped reporting progress.
+    """
+    jumps = stats["jumps"]
+    target_years = (stats["sim_time"] + duration) / SECONDS_PER_YEAR
+    physics.send("jump", duration)
+    clock = pygame.time.Clock()
+    last_progress = time.monotonic()
+    while True:
+        pygame.event.pump()  # Keeps the window responsive to the OS
+        snapshot = physics.read()
+        if snapshot:
+            last_progress = time.monotonic()
+            if snapshot[0]["jumps"] > jumps:
+                break
+            draw_jump_progress(snapshot[0]["jump_progress"], target_years)
+        elif not physics.process.is_alive() or time.monotonic() - last_progress > JUMP_STALL_TIMEOUT:
+            print("Jump abandoned: the simulation process stopped responding")
+            return stats
+        clock.tick(10)
+    stats, arrays = snapshot
+    for field in ("x", "y", "vx", "vy"):
+        getattr(bodies, field)[:] = arrays[field]
+    bodies.clear_trails()  # The old trails end a decade ago
+    return stats
+
+
+def handle_playback_key(key, player, playback_bodies):
+    """Scrubs a recording: arrows seek and change speed, space reverses, P pauses."""
+    if key in (pygame.K_LEFT, pygame.K_RIGHT):
+        direction = 1 if key == pygame.K_RIGHT else -1
+        player.seek(player.time + direction * 0.05 * (player.end - player.start))
+        playback_bodies.clear_trails()
+    elif key == pygame.K_UP:
+        player.speed *= 2
+    elif key == pygame.K_DOWN:
+        player.speed /= 2
+    elif key == pygame.K_SPACE:
+        player.speed = -player.speed
+    elif key == pygame.K_p:
+        player.paused = not player.paused
+
+
+def draw_game_screen(bodies, scale, visual_scale, offset_x, offset_y, trails_enabled, paused, hud_lines=(), tracers=(),
+                     density=False):
+    if density:
+        # Bodies and tracers binned per pixel: shows structure no disc drawing can at a million particles
+        x, y = bodies.x, bodies.y
+        if len(tracers):
+            x, y = np.concatenate((x, tracers.x)), np.concatenate((y, tracers.y))
+        draw_density(screen, x, y, scale, offset_x, offset_y)
+    else:
+        screen.fill(BLACK)
+
+        draw_tracers(screen, tracers, TRACER_COLOR, scale, offset_x, offset_y)
+
+        if trails_enabled:
+            draw_trails(screen, bodies.trails, bodies.color, scale, offset_x, offset_y)
+        # All bodies projected at once; off-screen ones are culled and those sharing a pixel merged
+        projection = Projection(bodies.x, bodies.y, bodies.radius, scale, visual_scale, offset_x, offset_y,
+                                SCREEN_WIDTH, SCREEN_HEIGHT)
+        draw_bodies(screen, projection, bodies.color, body_sprites)
+
+    for i, line in enumerate(hud_lines):
+        screen.blit(hud_font.render(line, True, WHITE), (10, 10 + i * 20))
 
     if paused:
         paused_text = font.render("PAUSED", True, red_text)
@@ -399,27 +416,68 @@ def draw_game_screen(bodies, scale, visual_scale, offset_x, offset_y, trails_ena
 
     pygame.display.flip()
 
-def handle_game_screen_click(pos, bodies, scale, offset_x, offset_y, locked_body):
-    x, y = pos
-    for body in bodies:
-        if body.is_clicked(x, y, scale, offset_x, offset_y):
-            # Lock the camera view on the clicked body
-            return body  # Return the locked body
+def handle_game_screen_click(pos, bodies, scale, visual_scale, offset_x, offset_y, locked_body):
+    projection = Projection(bodies.x, bodies.y, bodies.radius, scale, visual_scale, offset_x, offset_y,
+                            SCREEN_WIDTH, SCREEN_HEIGHT)
+    slot = projection.pick(*pos)
+    if slot is not None:
+        # Lock the camera view on the clicked body
+        return bodies[slot]  # Return the locked body
     return locked_body  # If no body is clicked, return the previous locked body
 
 
+def tracer_ring(bodies):
+    """Returns add_ring arguments for a belt of TRACER_COUNT tracers outside the bodies' orbits.
+
+    The belt circles the dominant body if there is one (the Sun), else the
+    centre of mass of the whole system (a circumbinary ring).
+    """
+    mass = bodies.mass
+    heaviest = mass.argmax()
+    if mass[heaviest] > 0.9 * mass.sum():
+        centre = (bodies.x[heaviest], bodies.y[heaviest], bodies.vx[heaviest], bodies.vy[heaviest])
+        central_mass = mass[heaviest]
+    else:
+        total = mass.sum()
+        centre = tuple((mass * value).sum() / total for value in (bodies.x, bodies.y, bodies.vx, bodies.vy))
+        central_mass = total
+    extent = max(math.hypot(body.x - centre[0], body.y - centre[1]) for body in bodies)
+    return centre, central_mass, 1.5 * extent, 2.5 * extent, TRACER_COUNT
+
+
 def main():
     running = True
     current_screen = "menu"
-    bodies = []
+    bodies = BodySystem()
     dt = 86400
     scale = 1e-7
     visual_scale = 1
     offset_x = SCREEN_WIDTH // 2
     offset_y = SCREEN_HEIGHT // 2
     trails_enabled = False
+    density_view = False  # Heatmap of particle density instead of discs, toggled with H
     locked_body = None  # Initially no body is locked
     paused = True
+    solver_index = 0  # Index into GRAVITY_SOLVERS
+    integrator = INTEGRATORS[INTEGRATOR]
+    # Levi-Civita treatment of close pairs around the integrator, toggled with K
+    regularize = False
+    tracers = TracerParticles()  # Positions of the worker's tracers, for drawing
+    # Target time warp starts at the old one-step-per-frame speed
+    warp = dt * 60
+    # Physics runs in its own process; settings changes are sent to it as commands
+    physics = SimulationProcess([solver for _, solver in GRAVITY_SOLVERS], INTEGRATOR,
+                                tracer_capacity=TRACER_COUNT, rewind_bytes=REWIND_MEMORY,
+                                rewind_steps=REWIND_STEPS)
+    physics.send("warp", warp)
+    physics.send("dt", dt)
+    stats = dict.fromkeys(STATS, 0)  # Counters of the latest physics snapshot
+    recorder = None  # TrajectoryRecorder while C recording is on
+    player = None  # TrajectoryPlayer while V playback is on
+    playback_bodies = None
+    reset_snapshot = None  # State restored by R: the preset's start or the last F9 load
+    rewind_time = None  # Sim time being rewound to while Backspace is held
+    rewinds_sent = 0
     clock = pygame.time.Clock()
 
     while running:
@@ -432,6 +490,7 @@ def main():
                     current_screen = handle_main_menu_click((x, y))
                 elif current_screen == "presets":
                     preset = handle_presets_click((x, y))
+                    tracers.clear()
                     if preset == "solar_system":
                         bodies = bodies_solar_system
                         current_screen = "game"
@@ -447,17 +506,27 @@ def main():
                             bodies = preset_binary_system 
                         current_screen = "game"
                         paused = False
+                    if current_screen == "game":
+                        reset_snapshot = PRESET_SNAPSHOTS[bodies]
+                        physics.load(bodies)
+                        physics.send("paused", paused)
                     elif preset == "menu":
                         current_screen = "menu"
                     elif current_screen == "tutorial":
                         current_screen = handle_tutorial_click((x, y))
                 elif current_screen == "game":
                     # Handle body click to lock view
-                    locked_body = handle_game_screen_click((x, y), bodies, scale, offset_x, offset_y, locked_body)
+                    shown = playback_bodies if player else bodies
+                    locked_body = handle_game_screen_click((x, y), shown, scale, visual_scale, offset_x, offset_y,
+                                                           locked_body)
 
+            elif event.type == pygame.KEYUP and event.key == pygame.K_BACKSPACE:
+                rewind_time = None
             elif event.type == pygame.KEYDOWN:
                 if current_screen == "game":
-                    if event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
+                    if player is not None and event.key in PLAYBACK_KEYS:
+                        handle_playback_key(event.key, player, playback_bodies)
+                    elif event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
                         scale *= 1.25
                         visual_scale *= 1.1
                     elif event.key == pygame.K_MINUS:
@@ -469,21 +538,110 @@ def main():
                         offset_y = SCREEN_HEIGHT // 2
                     elif event.key == pygame.K_p:
                         paused = not paused
+                        physics.send("paused", paused)
                     elif event.key == pygame.K_t:
                         trails_enabled = not trails_enabled
-                    elif event.key == pygame.K_s and dt <= 86400:
+                    elif event.key == pygame.K_h:
+                        density_view = not density_view
+                    elif event.key == pygame.K_s and dt <= integrator.max_dt:
                         dt *= 1.1
+                        warp *= 1.1
                     elif event.key == pygame.K_d and dt >= 600:
                         dt /= 1.1
-                    elif event.key == pygame.K_r:
-                        if bodies == preset_1:
-                            reset_simulation(bodies, initial_conditions_1)
-                        elif bodies == preset_2:
-                            reset_simulation(bodies, initial_conditions_2)
-                        elif bodies == preset_3:
-                            reset_simulation(bodies, initial_conditions_3)
-                        elif bodies == preset_binary_system:
-                            reset_simulation(bodies, initial_conditions_binary_system)
+                        warp /= 1.1
+                    elif (event.key == pygame.K_c and player is None and bodies
+                          and rewind_time is None and stats["rewinds"] == rewinds_sent):
+                        # Not while a rewind could still publish an earlier frame
+                        if recorder:
+                            recorder = stop_recording(recorder)
+                        else:
+                            recorder = TrajectoryRecorder(RECORDING_PATH, bodies, MAX_RECORDED_FRAMES)
+                    elif event.key == pygame.K_v:
+                        locked_body = None
+                        if player is not None:
+                            player = None  # Back to the live simulation
+                            physics.send("paused", paused)
+                        elif os.path.exists(RECORDING_PATH):
+                            recorder = stop_recording(recorder)
+                            player = TrajectoryPlayer(RECORDING_PATH)
+                            player.speed = warp
+                            playback_bodies = player.bodies()
+                            physics.send("paused", True)
+                    elif event.key == pygame.K_j and player is None and bodies:
+                        stats = jump_to_epoch(physics, bodies, stats, JUMP_TIME)
+                    elif event.key == pygame.K_RIGHTBRACKET:
+                        warp *= 2  # Faster time at the same dt
+                    elif event.key == pygame.K_LEFTBRACKET:
+                        warp /= 2
+                    elif event.key == pygame.K_i:
+                        names = list(INTEGRATORS)
+                        integrator = INTEGRATORS[names[(names.index(integrator.name) + 1) % len(names)]]
+                        physics.send("integrator", integrator.name)
+                        # Keep dt within what the new scheme tolerates
+                        if dt > integrator.max_dt:
+                            warp *= integrator.max_dt / dt
+                            dt = integrator.max_dt
+                        print(f"Integrator: {integrator.name}")
+                    elif event.key == pygame.K_k:
+                        regularize = not regularize
+                        physics.send("regularize", regularize)
+                        print(f"Close-encounter regularization: {'on' if regularize else 'off'}")
+                    elif event.key == pygame.K_g:
+                        solver_index = (solver_index + 1) % len(GRAVITY_SOLVERS)
+                        name, solver = GRAVITY_SOLVERS[solver_index]
+                        physics.send("solver", solver_index)
+                        print(f"Gravity solver: {name}")
+                        if hasattr(solver, "force_error") and bodies:
+                            print(solver.force_error(bodies.x, bodies.y, bodies.mass))
+                    elif event.key == pygame.K_a:
+                        if len(tracers):
+                            tracers.clear()
+                            physics.send("clear_tracers")
+                        elif bodies:
+                            physics.send("ring", *tracer_ring(bodies))
+                    elif event.key == pygame.K_BACKSPACE and player is None and bodies:
+                        # Rewinding pauses; P resumes from wherever it stopped
+                        recorder = stop_recording(recorder)
+                        paused = True
+                        physics.send("paused", paused)
+                        rewind_time = stats["sim_time"]
+                    elif event.key == pygame.K_r and reset_snapshot:
+                        recorder = stop_recording(recorder)
+                        tracers.clear()
+                        settings = reset_simulation(bodies, reset_snapshot)
+                        physics.load(bodies, settings["sim_time"])
+                        dt = settings["dt"]
+                        warp = dt * 60
+                        integrator = INTEGRATORS.get(settings["integrator"], integrator)
+                        physics.send("integrator", integrator.name)
+                    elif event.key == pygame.K_F5 and player is None and bodies:
+                        save_snapshot(SNAPSHOT_PATH, bodies, dt, stats["sim_time"], integrator.name)
+                        print(f"Saved snapshot to {SNAPSHOT_PATH}")
+                    elif event.key == pygame.K_F9 and player is None and os.path.exists(SNAPSHOT_PATH):
+                        with open(SNAPSHOT_PATH, "rb") as f:
+                            snapshot = f.read()
+                        try:
+                            # In place when the body count matches, so a locked body stays locked
+                            loaded, settings = decode_snapshot(snapshot, bodies)
+                            physics.load(loaded, settings["sim_time"])
+                        except ValueError as error:
+                            print(f"Cannot load {SNAPSHOT_PATH}: {error}")
+                        else:
+                            if loaded is not bodies:
+                                locked_body = None
+                            recorder = stop_recording(recorder)
+                            bodies, reset_snapshot = loaded, snapshot
+                            tracers.clear()
+                            dt = settings["dt"]
+                            warp = dt * 60
+                            integrator = INTEGRATORS.get(settings["integrator"], integrator)
+                            physics.send("integrator", integrator.name)
+                            print(f"Loaded snapshot from {SNAPSHOT_PATH}")
+                    if event.key in (pygame.K_s, pygame.K_d, pygame.K_i, pygame.K_r, pygame.K_F9):
+                        physics.send("dt", dt)
+                    if event.key in (pygame.K_s, pygame.K_d, pygame.K_i, pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET,
+                                     pygame.K_r, pygame.K_F9):
+                        physics.send("warp", warp)
 
         if current_screen == "menu":
             draw_main_menu()
@@ -492,28 +650,70 @@ def main():
         elif current_screen == "tutorial":
             draw_tutorial_screen()
         elif current_screen == "game":
+            if rewind_time is not None and stats["rewinds"] == rewinds_sent:
+                # One rewind in flight at a time, so a slow re-simulation cannot queue up
+                rewind_time = max(rewind_time - REWIND_SPEED * warp * clock.get_time() / 1000, stats["history"])
+                rewinds_sent += 1
+                physics.send("rewind", rewind_time)
+            # Copy in the latest state published by the physics process
+            snapshot = physics.read()
+            if snapshot:
+                stats, arrays = snapshot
+                for field in ("x", "y", "vx", "vy"):
+                    getattr(bodies, field)[:] = arrays[field]
+                bodies.record_trails(scale)
+                tracers.x, tracers.y = arrays["tx"], arrays["ty"]
+                if recorder and not recorder.record(stats["sim_time"], bodies.x, bodies.y):
+                    print(f"Recording full: {recorder.count} frames in {RECORDING_PATH}")
+                    recorder.close()
+                    recorder = None
+            shown = bodies
+            if player is not None:
+                # Replay from the recording; the live simulation stays paused meanwhile
+                player.advance(clock.get_time() / 1000)
+                playback_bodies.x[:], playback_bodies.y[:] = player.positions()
+                playback_bodies.record_trails(scale)
+                shown = playback_bodies
             if locked_body:
                 # Keep the view locked on the selected body
                 offset_x = SCREEN_WIDTH // 2 - locked_body.x * scale
                 offset_y = SCREEN_HEIGHT // 2 - locked_body.y * scale
-            if not paused:
-                # Perform simulation updates
-                for body in bodies:
-                    body.ax = 0
-                    body.ay = 0
-                for i, body1 in enumerate(bodies):
-                    for j, body2 in enumerate(bodies):
-                        if i != j:
-                            fx, fy = calculate_force(body1, body2)
-                            body1.ax += fx / body1.mass
-                            body1.ay += fy / body1.mass
-                for body in bodies:
-                    body.update_position(dt)
-
-            draw_game_screen(bodies, scale, visual_scale, offset_x, offset_y, trails_enabled, paused)
+
+            hud_lines = [
+                f"Year {stats['sim_time'] / SECONDS_PER_YEAR:,.2f}",
+                f"Time warp x{stats['achieved_warp']:,.0f} (target x{warp:,.0f})",
+                f"{stats['substeps']:.0f} substeps/tick, dt {dt:,.0f} s",
+                f"{integrator.name}{' + regularization' if regularize else ''} / {GRAVITY_SOLVERS[solver_index][0]}",
+            ]
+            if hasattr(integrator, "accepted"):
+                hud_lines.append(f"Adaptive steps: {stats['accepted']:.0f} accepted, {stats['rejected']:.0f} rejected")
+            if regularize:
+                hud_lines.append(f"Regularized steps: {stats['regularized']:.0f}")
+                if stats["regularization_failures"]:
+                    hud_lines.append(f"Regularization gave up on {stats['regularization_failures']:.0f} steps")
+            if len(tracers):
+                hud_lines.append(f"{len(tracers):,} tracer particles")
+            if recorder:
+                hud_lines.append(f"Recording: {recorder.count:,} frames")
+            if paused and stats["history"] < stats["sim_time"]:
+                hud_lines.append(f"Backspace rewinds to year {stats['history'] / SECONDS_PER_YEAR:,.2f}")
+            if player is not None:
+                hud_lines = [
+                    f"Playback year {player.time / SECONDS_PER_YEAR:,.2f} "
+                    f"(recorded {player.start / SECONDS_PER_YEAR:,.2f}-{player.end / SECONDS_PER_YEAR:,.2f})",
+                    f"Speed x{player.speed:,.0f} (arrows seek / speed, space reverses, V returns to live)",
+                ]
+                draw_game_screen(shown, scale, visual_scale, offset_x, offset_y, trails_enabled, player.paused,
+                                 hud_lines, density=density_view)
+            else:
+                draw_game_screen(bodies, scale, visual_scale, offset_x, offset_y, trails_enabled, paused, hud_lines,
+                                 tracers, density_view)
 
         clock.tick(60)
 
+    if recorder:
+        recorder.close()
+    physics.stop()
     pygame.quit()
     sys.exit()
 